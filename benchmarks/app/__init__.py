@@ -0,0 +1 @@
+default_app_config = 'benchmarks.app.apps.BenchmarkAppConfig'
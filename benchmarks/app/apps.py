@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class BenchmarkAppConfig(AppConfig):
+    name = 'benchmarks.app'
+    label = 'benchmarks'
+    verbose_name = 'Benchmark Application'
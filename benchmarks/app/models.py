@@ -0,0 +1,47 @@
+"""Synthetic schemas - wide models, FK chains, M2M graphs, 1-to-1 pairs."""
+
+from django.db import models
+
+WIDE_FIELDS = 60
+CHAIN_DEPTH = 10
+
+
+def _model(name, fields):
+    return type(name, (models.Model,), dict(fields, __module__=__name__))
+
+
+Wide = _model('Wide', {
+    f'field_{number}': (models.CharField(max_length=32, default='')
+                        if number % 2 else models.IntegerField(default=0))
+    for number in range(WIDE_FIELDS)})
+
+CHAIN = [_model('Chain0', {'name': models.CharField(max_length=32)})]
+for depth in range(1, CHAIN_DEPTH):
+    CHAIN.append(_model(f'Chain{depth}', {
+        'name': models.CharField(max_length=32),
+        'parent': models.ForeignKey(CHAIN[-1], on_delete=models.CASCADE),
+    }))
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=32)
+
+
+class Article(models.Model):
+    title = models.CharField(max_length=32)
+    tags = models.ManyToManyField(Tag, related_name='articles')
+
+
+class Profile(models.Model):
+    bio = models.CharField(max_length=32)
+
+
+class Account(models.Model):
+    login = models.CharField(max_length=32)
+    profile = models.OneToOneField(Profile, null=True,
+                                   on_delete=models.CASCADE)
+
+
+class Item(models.Model):
+    name = models.CharField(max_length=32)
+    position = models.IntegerField()
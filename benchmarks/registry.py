@@ -0,0 +1,58 @@
+"""Generated registrations of benchmark models."""
+
+from django_object_manager import ObjectManager
+
+from .app.models import (
+    CHAIN,
+    WIDE_FIELDS,
+    Account,
+    Article,
+    Item,
+    Profile,
+    Tag,
+    Wide,
+)
+
+WIDE_KEYS = 500
+CHAIN_KEYS = 50
+TAG_KEYS = 200
+ARTICLE_KEYS = 50
+TAGS_PER_ARTICLE = 40
+PAIR_KEYS = 200
+ITEM_KEYS = 5000
+
+ObjectManager.register(Wide, {
+    f'wide_{key}': {f'field_{number}': (f'value {key}' if number % 2
+                                        else key)
+                    for number in range(WIDE_FIELDS)}
+    for key in range(WIDE_KEYS)})
+
+ObjectManager.register(CHAIN[0], {
+    f'chain_{key}': {'name': f'Chain {key}'}
+    for key in range(CHAIN_KEYS)})
+for model in CHAIN[1:]:
+    ObjectManager.register(model, {
+        f'chain_{key}': {'name': f'Chain {key}', 'parent': f'chain_{key}'}
+        for key in range(CHAIN_KEYS)})
+
+ObjectManager.register(Tag, {
+    f'tag_{key}': {'name': f'Tag {key}'}
+    for key in range(TAG_KEYS)})
+ObjectManager.register(Article, {
+    f'article_{key}': {
+        'title': f'Article {key}',
+        'tags': [f'tag_{(key + number) % TAG_KEYS}'
+                 for number in range(TAGS_PER_ARTICLE)]}
+    for key in range(ARTICLE_KEYS)})
+
+ObjectManager.register(Profile, {
+    f'profile_{key}': {'bio': f'Profile {key}'}
+    for key in range(PAIR_KEYS)})
+ObjectManager.register(Account, {
+    f'account_{key}': {'login': f'account_{key}',
+                       'profile': f'profile_{key}'}
+    for key in range(PAIR_KEYS)})
+
+ObjectManager.register(Item, {
+    f'item_{key}': {'name': f'Item {key}', 'position': key}
+    for key in range(ITEM_KEYS)})
@@ -0,0 +1,199 @@
+"""Object manager benchmarks.
+
+Usage: python -m benchmarks.run [--repeat N] [--output results.json]
+                                [--compare previous.json] [name ...]
+
+Every benchmark creates objects with a fresh `ObjectManager` inside a rolled
+back transaction of in-memory SQLite database. Wall time is measured
+separately from query count and peak memory (tracemalloc), which slow the
+code down.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tracemalloc
+from time import perf_counter
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from django_object_manager import ObjectManager  # noqa: E402
+
+from . import registry  # noqa: E402
+
+BENCHMARKS = {}
+
+
+def benchmark(name, setup=None):
+    """Register benchmark, `setup` runs before measurement."""
+    def decorator(function):
+        BENCHMARKS[name] = (setup, function)
+        return function
+    return decorator
+
+
+@benchmark('compile')
+def compile_registry(object_manager):
+    ObjectManager._compiled = False
+    ObjectManager._orders = {}
+    ObjectManager.compile()
+
+
+@benchmark('single_wide')
+def single_wide(object_manager):
+    object_manager.get_wide('wide_0')
+
+
+@benchmark('multiple_wide')
+def multiple_wide(object_manager):
+    object_manager.get_wides()
+
+
+@benchmark('multiple_items')
+def multiple_items(object_manager):
+    object_manager.get_items()
+
+
+@benchmark('deep_chain')
+def deep_chain(object_manager):
+    last = registry.CHAIN[-1].__name__.lower()
+    getattr(object_manager, f'get_{last}s')()
+
+
+@benchmark('m2m_heavy')
+def m2m_heavy(object_manager):
+    object_manager.get_articles()
+
+
+@benchmark('one2one_pairs')
+def one2one_pairs(object_manager):
+    object_manager.get_accounts()
+
+
+@benchmark('custom_wide')
+def custom_wide(object_manager):
+    for number in range(100):
+        object_manager.get_wide('wide_0', field_1=f'custom {number}')
+
+
+@benchmark('kwargs_only')
+def kwargs_only(object_manager):
+    for number in range(100):
+        object_manager.get_item(name=f'Item {number}', position=number)
+
+
+@benchmark('raw_items')
+def raw_items(object_manager):
+    object_manager.insert({'item': '__all__'}, backend='raw')
+
+
+def _create_items(object_manager):
+    object_manager.get_items()
+
+
+@benchmark('cached_gets', setup=_create_items)
+def cached_gets(object_manager):
+    for number in range(registry.ITEM_KEYS):
+        object_manager.get_item(f'item_{number}')
+
+
+def _run(setup, function, instrument):
+    with transaction.atomic():
+        object_manager = ObjectManager()
+        if setup is not None:
+            setup(object_manager)
+        if instrument:
+            tracemalloc.start()
+            with CaptureQueriesContext(connection) as queries:
+                function(object_manager)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            result = {'queries': len(queries), 'peak_memory': peak}
+        else:
+            started = perf_counter()
+            function(object_manager)
+            result = {'seconds': perf_counter() - started}
+        transaction.set_rollback(True)
+    return result
+
+
+def run(names, repeat):
+    """Run benchmarks, return results keyed by name."""
+    results = {}
+    for name in names:
+        setup, function = BENCHMARKS[name]
+        timings = [_run(setup, function, False)['seconds']
+                   for _ in range(repeat)]
+        results[name] = dict(
+            _run(setup, function, True),
+            seconds_min=min(timings),
+            seconds_median=statistics.median(timings),
+            repeat=repeat)
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print(results, previous):
+    print(f'{"benchmark":<16}{"median, s":>12}{"queries":>10}'
+          f'{"peak, KiB":>12}{"vs previous":>14}')
+    for name, result in results.items():
+        change = ''
+        if name in previous:
+            ratio = result['seconds_median'] / \
+                previous[name]['seconds_median']
+            change = f'{ratio:.2f}x'
+        print(f'{name:<16}{result["seconds_median"]:>12.4f}'
+              f'{result["queries"]:>10}'
+              f'{result["peak_memory"] / 1024:>12.0f}{change:>14}')
+
+
+def main(argv=None):
+    """Run benchmarks from command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('names', nargs='*',
+                        help='Benchmarks to run, all by default: ' +
+                        ', '.join(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Save JSON results into file')
+    parser.add_argument('--compare', help='JSON results to compare with')
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(sorted(unknown))}')
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    results = run(args.names or list(BENCHMARKS), args.repeat)
+    previous = {}
+    if args.compare:
+        with open(args.compare) as source:
+            previous = json.load(source)['results']
+    _print(results, previous)
+    if args.output:
+        with open(args.output, 'w') as target:
+            json.dump({'commit': _commit(),
+                       'python': platform.python_version(),
+                       'django': django.get_version(),
+                       'results': results},
+                      target, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,13 @@
+"""Benchmark project settings."""
+
+SECRET_KEY = 'benchmark'
+INSTALLED_APPS = [
+    'benchmarks.app'
+    ]
+
+DATABASES = {
+  'default': {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': ':memory:',
+  }
+}
@@ -1,6 +1,19 @@
 """Django REST framework serializer cache."""
 
-from .object_manager import ObjectManager, ObjManagerMixin
+from .object_manager import (
+    ObjectManager,
+    ObjManagerMixin,
+    ObjManagerTestDataMixin,
+)
 
 del object_manager
 del field_converters
+del backends
+del batch
+del cache
+del snapshot
+del lazy
+del stats
+del tracking
+del registries
+del scenarios
@@ -0,0 +1,118 @@
+"""Insert backends, which write registered objects without model instances."""
+
+from django.db import connections, router
+from django.db.models import AutoField, DateField, Model
+from django.utils import timezone
+
+from .batch import last_inserted_pks
+
+__all__ = ('RawBackend', 'get_backend')
+
+
+class RawBackend:
+    """Inserts rows with `executemany`, bypassing model instances.
+
+    Params are compiled straight into column values, so `save()`, signals
+    and `pre_save` logic (except `auto_now` fields) are skipped. Forward
+    foreign keys and M2M relations are supported, referenced registered
+    objects are created by object manager.
+    """
+
+    def insert(self, object_manager, model, rows):
+        """Insert rows of model params, return their primary keys."""
+        if model._meta.parents:
+            raise ValueError(f'{model.__name__}: raw backend does not '
+                             f'support multi-table inheritance')
+        if not rows:
+            return []
+        using = router.db_for_write(model)
+        connection = connections[using]
+        fields = [field for field in model._meta.concrete_fields
+                  if not isinstance(field, AutoField)]
+        m2m_fields = {field.name: field
+                      for field in model._meta.many_to_many}
+        names = {name for field in fields
+                 for name in (field.name, field.attname)}
+        values = []
+        for params in rows:
+            unknown = set(params) - names - set(m2m_fields)
+            if unknown:
+                raise ValueError(f'{model.__name__}: raw backend can not set '
+                                 f'{", ".join(sorted(unknown))}')
+            object_manager._create_references(model, params)
+            values.append([
+                field.get_db_prep_save(
+                    self._value(object_manager, field, params),
+                    connection=connection)
+                for field in fields])
+        pks = self._execute(connection, model, fields, values)
+        object_manager._record_raw(model, pks)
+        for name, field in m2m_fields.items():
+            self._insert_links(object_manager, field, [
+                (pk, params[name]) for pk, params in zip(pks, rows)
+                if params.get(name)])
+        return pks
+
+    def _value(self, object_manager, field, params):
+        if field.name in params:
+            value = params[field.name]
+            if field.is_relation and value is not None:
+                value = self._related_pk(object_manager, field, value)
+            return value
+        if field.attname in params:
+            return params[field.attname]
+        if getattr(field, 'auto_now', False) or \
+                getattr(field, 'auto_now_add', False):
+            now = timezone.now()
+            if isinstance(field, DateField):
+                # DateTimeField.to_python() keeps datetime as it is
+                return field.to_python(now)
+            return now.time()
+        return field.get_default()
+
+    def _related_pk(self, object_manager, field, value):
+        if isinstance(value, Model):
+            return getattr(value, field.target_field.attname)
+        if isinstance(value, str):
+            name = object_manager._name_of(field.related_model)
+            return getattr(object_manager._get(name, value),
+                           field.target_field.attname)
+        return value
+
+    def _insert_links(self, object_manager, field, links):
+        through = field.remote_field.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        rows = [{source: pk, target: related}
+                for pk, values in links for related in values]
+        if rows:
+            self.insert(object_manager, through, rows)
+
+    def _execute(self, connection, model, fields, values):
+        quote_name = connection.ops.quote_name
+        columns = ', '.join(quote_name(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {quote_name(model._meta.db_table)} '
+                f'({columns}) VALUES ({placeholders})',
+                values)
+        pk = model._meta.pk
+        if pk in fields:
+            index = fields.index(pk)
+            return [row[index] for row in values]
+        return last_inserted_pks(model, connection.alias, len(values))
+
+
+def get_backend(backend):
+    """Return backend instance, backend may be given by name."""
+    if isinstance(backend, str):
+        try:
+            return named_backends[backend]()
+        except KeyError:
+            raise ValueError(f'Unknown insert backend: {backend}, choices '
+                             f'are: {", ".join(named_backends)}') from None
+    return backend
+
+
+named_backends = {'raw': RawBackend}
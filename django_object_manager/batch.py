@@ -0,0 +1,207 @@
+"""Unit of work - deferred, dependency ordered bulk object insertion."""
+
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import router
+from django.db.models import Model, Q
+from django.db.models.signals import post_save, pre_save
+
+from .stats import no_stats
+from .tracking import mark_saved
+
+__all__ = ('Batch', 'bulk_delete', 'bulk_insert', 'dependency_levels',
+           'last_inserted_pks')
+
+
+def _related_objects(instance):
+    """Yield `(field, object)` for every forward relation set on instance."""
+    for field in instance._meta.concrete_fields:
+        if field.is_relation and field.is_cached(instance):
+            obj = field.get_cached_value(instance)
+            if obj is not None:
+                yield field, obj
+
+
+def _saved_one_by_one(model):
+    """Check whether model has custom save logic, skipped by bulk insert."""
+    return (model.save is not Model.save or
+            pre_save.has_listeners(model) or
+            post_save.has_listeners(model))
+
+
+def bulk_insert(model, instances):
+    """Insert instances of a single model, assigning their primary keys.
+
+    Models with overridden `save()` or `pre_save`/`post_save` receivers are
+    saved one by one.
+    """
+    for instance in instances:
+        # Related objects might have been unsaved when they were assigned
+        for field, obj in _related_objects(instance):
+            setattr(instance, field.attname,
+                    getattr(obj, field.target_field.attname))
+    using = router.db_for_write(model, instance=instances[0])
+    if model._meta.parents or _saved_one_by_one(model):
+        # bulk_create does not support multi-table inheritance
+        for instance in instances:
+            instance.save(force_insert=True, using=using)
+        mark_saved(instances)
+        return
+    new = [instance for instance in instances if instance.pk is None]
+    model._base_manager.using(using).bulk_create(instances)
+    if new and new[0].pk is None:
+        # Backend can not return ids from bulk insert
+        pks = last_inserted_pks(model, using, len(new))
+        for instance, pk in zip(new, pks):
+            instance.pk = pk
+            instance._state.adding = False
+            instance._state.db = using
+    mark_saved(instances)
+
+
+def last_inserted_pks(model, using, count):
+    """Return primary keys of `count` rows, which were just inserted.
+
+    Fixtures are created by a single writer, so rows which were just
+    inserted hold the highest auto-increment keys of the table.
+    """
+    pks = model._base_manager.using(using) \
+        .order_by('-pk').values_list('pk', flat=True)[:count]
+    return list(reversed(pks))
+
+
+def dependency_levels(instances):
+    """Group instances into levels, which depend only on previous levels."""
+    known = {id(instance) for instance in instances}
+    levels = {}
+
+    def level(instance):
+        if id(instance) not in levels:
+            # Placeholder guards against reference cycles
+            levels[id(instance)] = 0
+            levels[id(instance)] = max(
+                (level(obj) + 1 for _, obj in _related_objects(instance)
+                 if id(obj) in known),
+                default=0)
+        return levels[id(instance)]
+
+    grouped = defaultdict(list)
+    for instance in instances:
+        grouped[level(instance)].append(instance)
+    return [grouped[number] for number in sorted(grouped)]
+
+
+def _deletion_order(models):
+    """Return models, so that referencing models precede referenced ones."""
+    remaining = list(models)
+    ordered = []
+    while remaining:
+        referenced = {field.related_model for model in remaining
+                      for field in model._meta.concrete_fields
+                      if field.is_relation and
+                      field.related_model is not model}
+        ready = [model for model in remaining if model not in referenced]
+        if not ready:
+            # Reference cycle, constraints are expected to be deferred
+            ready = remaining[:1]
+        ordered.extend(ready)
+        remaining = [model for model in remaining if model not in ready]
+    return ordered
+
+
+def bulk_delete(instances, pks=None, chunk_size=500):
+    """Delete rows of instances and `{model: pks}` with one query per model.
+
+    Rows without primary key (M2M links, inserted by related managers) are
+    matched by their relation fields. Cascades and signals are skipped, so
+    rows must not be referenced by other rows.
+    """
+    by_model = defaultdict(lambda: ([], []))
+    for model, model_pks in (pks or {}).items():
+        by_model[model][0].extend(model_pks)
+    for instance in instances:
+        if instance.pk is not None:
+            by_model[type(instance)][0].append(instance.pk)
+        else:
+            by_model[type(instance)][1].append(instance)
+    for model in list(by_model):
+        # Rows of multi-table inheritance parents share primary keys
+        for parent in model._meta.get_parent_list():
+            by_model[parent][0].extend(by_model[model][0])
+    for model in _deletion_order(by_model):
+        model_pks, links = by_model[model]
+        using = router.db_for_write(model)
+        queryset = model._base_manager.using(using)
+        if model_pks:
+            queryset.filter(pk__in=model_pks)._raw_delete(using)
+        relations = [field for field in model._meta.concrete_fields
+                     if field.is_relation]
+        for start in range(0, len(links), chunk_size):
+            condition = reduce(or_, (
+                Q(**{field.attname: getattr(link, field.attname)
+                     for field in relations})
+                for link in links[start:start + chunk_size]))
+            queryset.filter(condition)._raw_delete(using)
+
+
+class Batch:
+    """Objects, which will be inserted when the batch is flushed."""
+
+    def __init__(self, inserted, measure=None):
+        """Initialize empty batch, inserted objects are appended to list.
+
+        `measure(instances)` returns context, which measures inserts and post
+        actions done for instances.
+        """
+        self.pending = []
+        self.links = defaultdict(list)
+        self.owners = defaultdict(dict)
+        self.inserted = inserted
+        self.measure = measure or (lambda instances: no_stats)
+        self._owner = None
+
+    def add(self, instance, post_actions):
+        """Schedule instance insertion, followed by post actions."""
+        self.pending.append((instance, post_actions))
+
+    def add_links(self, through, rows):
+        """Schedule insertion of M2M links, after post actions."""
+        self.links[through].extend(rows)
+        if self._owner is not None:
+            self.owners[through][id(self._owner)] = self._owner
+
+    def instances(self):
+        """Return all scheduled instances."""
+        return [instance for instance, _ in self.pending]
+
+    def flush(self):
+        """Insert pending objects with one bulk insert per model and level.
+
+        M2M links, added by post actions, are inserted with one bulk insert
+        per through model.
+        """
+        for level in dependency_levels(self.instances()):
+            by_model = defaultdict(list)
+            for instance in level:
+                by_model[type(instance)].append(instance)
+            for model, instances in by_model.items():
+                with self.measure(instances):
+                    bulk_insert(model, instances)
+                self.inserted.extend(instances)
+        for instance, post_actions in self.pending:
+            self._owner = instance
+            try:
+                with self.measure([instance]):
+                    for action in post_actions:
+                        action(instance)
+            finally:
+                self._owner = None
+        for through, rows in self.links.items():
+            with self.measure(list(self.owners[through].values())):
+                bulk_insert(through, rows)
+            self.inserted.extend(rows)
+        self.pending = []
+        self.links = defaultdict(list)
+        self.owners = defaultdict(dict)
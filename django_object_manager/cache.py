@@ -0,0 +1,213 @@
+"""Compact instance cache, which keeps primary keys and few hot instances."""
+
+from array import array
+from collections import OrderedDict, defaultdict
+from collections.abc import MutableMapping
+from itertools import islice
+
+from .tracking import mark_saved
+
+__all__ = ('CompactCache', 'CompactInstances', 'CompactLog', 'PkArray')
+
+
+class PkArray:
+    """Primary keys, packed into an array while they are integers."""
+
+    __slots__ = ('items',)
+
+    def __init__(self):
+        """Initialize empty array."""
+        self.items = array('q')
+
+    def append(self, pk):
+        """Append primary key, switching to list for non-integer keys."""
+        if isinstance(self.items, array):
+            try:
+                self.items.append(pk)
+                return
+            except (TypeError, OverflowError):
+                self.items = list(self.items)
+        self.items.append(pk)
+
+    def __getitem__(self, index):
+        """Return primary key at index."""
+        return self.items[index]
+
+    def __iter__(self):
+        """Iterate over primary keys."""
+        return iter(self.items)
+
+    def __len__(self):
+        """Return number of primary keys."""
+        return len(self.items)
+
+
+class CompactLog:
+    """Insert log, which keeps primary keys of inserted rows per model.
+
+    Rows without primary key (M2M links) are kept as they are.
+    """
+
+    def __init__(self):
+        """Initialize empty log."""
+        self.pks = defaultdict(PkArray)
+        self.links = []
+
+    def extend(self, instances):
+        """Record inserted rows."""
+        for instance in instances:
+            if instance.pk is None:
+                self.links.append(instance)
+            else:
+                self.pks[type(instance)].append(instance.pk)
+
+
+class CompactCache(dict):
+    """Compact instance mappings by name, sharing LRU of hot instances."""
+
+    def __init__(self, models, size):
+        """Initialize empty cache, keeping up to `size` instances."""
+        super().__init__()
+        self.models = models
+        self.size = size
+        self.hot = OrderedDict()
+
+    def __missing__(self, name):
+        """Create mapping of registered name."""
+        instances = self[name] = CompactInstances(self, name,
+                                                  self.models[name])
+        return instances
+
+    def touch(self, name, key, instance):
+        """Keep instance in memory as recently used."""
+        self.hot[name, key] = instance
+        self.hot.move_to_end((name, key))
+        while len(self.hot) > self.size:
+            self.hot.popitem(last=False)
+
+
+class CompactInstances(MutableMapping):
+    """Mapping of keys to instances, which stores only primary keys.
+
+    Evicted instances are loaded again by primary key, `get_many` loads
+    several instances with one query. Unsaved instances (in pending batch)
+    are kept until they are inserted.
+    """
+
+    def __init__(self, cache, name, model):
+        """Initialize empty mapping."""
+        self.cache = cache
+        self.name = name
+        self.model = model
+        self.positions = {}
+        self.indexed_keys = []
+        self.pks = PkArray()
+        self.unsaved = {}
+
+    def settle(self):
+        """Move inserted instances from unsaved ones."""
+        for key, instance in list(self.unsaved.items()):
+            if instance.pk is not None:
+                self[key] = instance
+
+    def __setitem__(self, key, instance):
+        """Store primary key of instance."""
+        if instance.pk is None:
+            if key in self.positions:
+                self._discard(key)
+            self.unsaved[key] = instance
+            return
+        self.unsaved.pop(key, None)
+        if key in self.positions:
+            self._discard(key)
+        self.positions[key] = len(self.indexed_keys)
+        self.indexed_keys.append(key)
+        self.pks.append(instance.pk)
+        self.cache.touch(self.name, key, instance)
+
+    def __getitem__(self, key):
+        """Return hot instance or load it by primary key."""
+        self.settle()
+        if key in self.unsaved:
+            return self.unsaved[key]
+        instance = self.cache.hot.get((self.name, key))
+        if instance is not None:
+            self.cache.hot.move_to_end((self.name, key))
+            return instance
+        pk = self.pks[self.positions[key]]
+        instance = self.model._base_manager.get(pk=pk)
+        mark_saved([instance])
+        self.cache.touch(self.name, key, instance)
+        return instance
+
+    def get_many(self, keys):
+        """Return `{key: instance}` of stored keys, loading with one query."""
+        self.settle()
+        result = {}
+        missing = {}
+        for key in keys:
+            if key in self.unsaved:
+                result[key] = self.unsaved[key]
+            elif (self.name, key) in self.cache.hot:
+                result[key] = self.cache.hot[self.name, key]
+            elif key in self.positions:
+                missing[self.pks[self.positions[key]]] = key
+        if missing:
+            loaded = self.model._base_manager.in_bulk(list(missing))
+            mark_saved(loaded.values())
+            for pk, instance in loaded.items():
+                result[missing[pk]] = instance
+        return result
+
+    def key_of(self, instance):
+        """Return key of instance or `None`."""
+        for key, unsaved in self.unsaved.items():
+            if unsaved is instance:
+                return key
+        if instance.pk is None:
+            return None
+        for index, pk in enumerate(self.pks):
+            if pk == instance.pk and self.indexed_keys[index] is not None:
+                return self.indexed_keys[index]
+        return None
+
+    def _discard(self, key):
+        self.indexed_keys[self.positions.pop(key)] = None
+        self.cache.hot.pop((self.name, key), None)
+
+    def __delitem__(self, key):
+        """Forget key."""
+        if key in self.unsaved:
+            del self.unsaved[key]
+        elif key in self.positions:
+            self._discard(key)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        """Check key without loading instance."""
+        return key in self.positions or key in self.unsaved
+
+    def __iter__(self):
+        """Iterate over keys."""
+        self.settle()
+        yield from list(self.unsaved)
+        yield from list(self.positions)
+
+    def __len__(self):
+        """Return number of keys."""
+        return len(self.positions) + len(self.unsaved)
+
+    def items(self, chunk_size=1000):
+        """Iterate over `(key, instance)`, loading instances in chunks."""
+        keys = iter(self)
+        chunk = list(islice(keys, chunk_size))
+        while chunk:
+            instances = self.get_many(chunk)
+            yield from ((key, instances[key]) for key in chunk
+                        if key in instances)
+            chunk = list(islice(keys, chunk_size))
+
+    def values(self):
+        """Iterate over instances, loading them in chunks."""
+        return (instance for _, instance in self.items())
@@ -2,6 +2,7 @@
 
 from functools import partial
 from collections import namedtuple
+from inspect import getattr_static
 
 from django.db.models import (
     ForeignKey,
@@ -9,6 +10,9 @@ from django.db.models import (
     ManyToManyField,
     OneToOneRel,
 )
+from django.db.models.signals import m2m_changed
+
+from .tracking import save_changed
 
 __all__ = ('default_converters',)
 
@@ -16,96 +20,164 @@ FieldConverterResult = namedtuple('FieldConverterResult',
                                   'field_value post_actions pass_field_value')
 
 
+def _get_related(object_manager, model, value):
+    """Return related instance, value is either instance or registered id."""
+    if isinstance(value, model):
+        # Related value is already initialized, nothing to do here
+        return value
+    assert isinstance(value, str), \
+        'Related values must be either instances or str ids'
+    name = object_manager._name_of(model)
+    return object_manager._get_or_create(name,
+                                         value,
+                                         **object_manager._data[name][value])
+
+
+def _through_rows(through, source_name, target_name, instance, values):
+    return [through(**{source_name: instance, target_name: value})
+            for value in values]
+
+
+def _add_links(object_manager, through, rows):
+    """Add links to flushed batch, return whether they were added."""
+    batch = object_manager._flushing
+    if batch is None or (through._meta.auto_created and
+                         m2m_changed.has_listeners(through)):
+        # Related managers send m2m_changed for auto created through models
+        return False
+    batch.add_links(through, rows)
+    return True
+
+
+class _BuiltRelatedDescriptor:
+    """Related manager descriptor, which also serves unsaved built objects.
+
+    Related managers can not be created for objects without primary key.
+    Manager of built object is created with a placeholder primary key, it
+    returns related values cached by object manager.
+    """
+
+    def __init__(self, descriptor, cache_name):
+        """Wrap related manager descriptor of model."""
+        self.descriptor = descriptor
+        self.cache_name = cache_name
+
+    def __get__(self, instance, cls=None):
+        """Return related manager, class access returns wrapped descriptor."""
+        if instance is None or instance.pk is not None or \
+                self.cache_name not in getattr(
+                    instance, '_prefetched_objects_cache', {}):
+            return self.descriptor.__get__(instance, cls)
+        instance.pk = 0
+        try:
+            return self.descriptor.__get__(instance, cls)
+        finally:
+            instance.pk = None
+
+    def __set__(self, instance, value):
+        """Delegate assignment to wrapped descriptor."""
+        self.descriptor.__set__(instance, value)
+
+
+def _cache_related(instance, accessor_name, cache_name, model, values):
+    # Same as prefetch_related(), related manager uses cached values
+    queryset = model._default_manager.all()
+    queryset._result_cache = list(values)
+    queryset._prefetch_done = True
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[cache_name] = queryset
+    descriptor = getattr_static(type(instance), accessor_name)
+    if not isinstance(descriptor, _BuiltRelatedDescriptor):
+        setattr(type(instance), accessor_name,
+                _BuiltRelatedDescriptor(descriptor, cache_name))
+
+
 def create_foreign_key(object_manager, field, value):
-    foreign_model = field.remote_field.model
-    name = foreign_model.__name__.lower()
     post_actions = []
     pass_field_value = True
-    if isinstance(value, foreign_model):
-        # FK value is already initialized, nothing to do here
-        value = value
-    else:
-        assert isinstance(value, str), \
-            'Related values must be either instances or str ids'
-        # TODO Use type to select related model, name can be misleading !
-        value = object_manager._get_or_create(
-            name,
-            value,
-            **object_manager._data[name][value])
+    value = _get_related(object_manager, field.remote_field.model, value)
     return FieldConverterResult(value, post_actions, pass_field_value)
 
 
-# TODO M2M are similar, probably they can be combined
 def create_m2m_reverse(object_manager, field, values):
-
-    def cb(field, field_val, instance):
-        args = \
-            {instance._meta.model.__name__.lower(): instance,
-             field.related_model.__name__.lower(): field_val}
-        # Create dependency after main object, using
+    m2m_field = field.remote_field
+
+    def cb(related_values, instance):
+        if object_manager._build:
+            _cache_related(instance, field.get_accessor_name(),
+                           m2m_field.related_query_name(),
+                           field.related_model, related_values)
+            return
+        # Create dependencies after main object, using
         # M2M "through" model
-        field.through(**args).save()
-
-    foreing_model = field.related_model
-    name = foreing_model.__name__.lower()
-
-    def gen():
-        for value in values:
-            if isinstance(value, foreing_model):
-                yield value
-            else:
-                assert isinstance(value, str), \
-                    'Related values must be either instances or str ids'
-                yield object_manager._get_or_create(name,
-                                          value,
-                                          **object_manager._data[name][value])
-    res = list(gen())
+        rows = _through_rows(field.through,
+                             m2m_field.m2m_reverse_field_name(),
+                             m2m_field.m2m_field_name(),
+                             instance,
+                             related_values)
+        if not _add_links(object_manager, field.through, rows):
+            field.through._base_manager.bulk_create(rows)
+            object_manager._record(rows)
+
+    res = [_get_related(object_manager, field.related_model, value)
+           for value in values]
     return FieldConverterResult(
         [],
-        [partial(cb, field, related_val) for related_val in res],
+        [partial(cb, res)] if res else [],
         False)
 
 
 def create_m2m_forward(object_manager, field, values):
-
-    def cb(field, field_val, instance):
-        field_val.save()
-        # Delay forward M2M dependency,
-        # use RelatedManager helper
-        # TODO no related manager if `through` model has extra attributes ???
-        getattr(instance, field.name).add(field_val)
-    foreing_model = field.related_model
-    name = foreing_model.__name__.lower()
-
-    def gen():
-        for value in values:
-            if isinstance(value, foreing_model):
-                yield value
-            else:
-                assert isinstance(value, str), \
-                    'Related values must be either instances or str ids'
-                yield object_manager._get_or_create(name,
-                                                    value,
-                                                    **object_manager._data[name][value])
-    res = list(gen())
+    through = field.remote_field.through
+
+    def cb(related_values, instance):
+        if object_manager._build:
+            _cache_related(instance, field.name, field.name,
+                           field.related_model, related_values)
+            return
+        for field_val in related_values:
+            # Unchanged saved objects are not written again
+            save_changed(field_val)
+        if through._meta.auto_created:
+            # Related manager ignores duplicate links
+            related_values = list(dict.fromkeys(related_values))
+        rows = _through_rows(through,
+                             field.m2m_field_name(),
+                             field.m2m_reverse_field_name(),
+                             instance,
+                             related_values)
+        if _add_links(object_manager, through, rows):
+            return
+        if through._meta.auto_created:
+            # Delay forward M2M dependency,
+            # use RelatedManager helper
+            getattr(instance, field.name).add(*related_values)
+        else:
+            # Single insert for all links of custom `through` model
+            through._base_manager.bulk_create(rows)
+        object_manager._record(rows)
+
+    res = [_get_related(object_manager, field.related_model, value)
+           for value in values]
     return FieldConverterResult(
         [],
-        [partial(cb, field, related_val) for related_val in res],
+        [partial(cb, res)] if res else [],
         False)
 
 
 def create_one2one(object_manager, field, value):
-    foreing_model = field.related_model
-    name = foreing_model.__name__.lower()
+    name = object_manager._name_of(field.related_model)
     assert isinstance(value, str)
-    assert value not in object_manager._instances[name]
+    assert value not in object_manager._cache()[name]
     # DB record will be created during "main" model creation
     def cb(field_val, instance):
-        setattr(field_val,
-                instance._meta.model.__name__.lower(),
-                instance)
+        setattr(field_val, field.remote_field.name, instance)
+        if object_manager._build:
+            return
         # Delay 1-to-1 dependency object creation
-        field_val.save()
+        save_changed(field_val)
+        object_manager._record([field_val])
     value = object_manager._get_or_create(name, value, _create_in_db=False,
                                           **object_manager._data[name][value])
     return FieldConverterResult(
@@ -119,3 +191,17 @@ default_converters = {ForeignKey: create_foreign_key,
                       ManyToManyField: create_m2m_forward,
                       OneToOneRel: create_one2one,
                       }
+
+
+def post_action_queries(field, converter, value):
+    """Return expected number of queries, done by default post actions."""
+    if converter is create_m2m_forward and value:
+        # Related objects are unchanged, RelatedManager.add() selects
+        # existing links before insert
+        auto_created = field.remote_field.through._meta.auto_created
+        return 2 if auto_created else 1
+    if converter is create_m2m_reverse and value:
+        return 1
+    if converter is create_one2one:
+        return 1
+    return 0
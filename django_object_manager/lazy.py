@@ -0,0 +1,100 @@
+"""Lazy handles, which insert objects only when their identity is needed."""
+
+__all__ = ('LazyHandle',)
+
+
+class LazyHandle:
+    """Object, which is inserted when its primary key is needed.
+
+    Handle pretends to be an instance of the model. Plain field values are
+    read without queries, any other attribute access (primary key,
+    relations, methods), comparison or use in queryset filters inserts the
+    object with its required dependencies. M2M links are created when M2M
+    related manager is accessed.
+    """
+
+    def __init__(self, object_manager, name, key, custom, params):
+        """Initialize handle of not yet created object."""
+        model = object_manager._get_model(name)
+        m2m_names = object_manager._get_plan(model).m2m_names
+        fields = {field.name for field in model._meta.concrete_fields
+                  if not field.is_relation and not field.primary_key}
+        self._lazy_object_manager = object_manager
+        self._lazy_model = model
+        self._lazy_name = name
+        self._lazy_key = key
+        self._lazy_custom = custom
+        self._lazy_params = {name: value for name, value in params.items()
+                             if name not in m2m_names}
+        self._lazy_m2m = {name: value for name, value in params.items()
+                          if name in m2m_names}
+        self._lazy_fields = fields
+        self._lazy_preview = model(**{name: value
+                                      for name, value in params.items()
+                                      if name in fields})
+        self._lazy_instance = None
+
+    @property
+    def __class__(self):
+        """Pass isinstance() checks, done by Django relations."""
+        return self._lazy_model
+
+    def materialize(self):
+        """Return saved object, creating it if needed."""
+        if self._lazy_instance is None:
+            object_manager = self._lazy_object_manager
+            if not self._lazy_custom and object_manager._get(
+                    self._lazy_name, self._lazy_key) is not None:
+                # Already created with all relations as a dependency
+                self._lazy_m2m = {}
+            self._lazy_instance = object_manager._get_or_create(
+                self._lazy_name,
+                self._lazy_key,
+                _custom=self._lazy_custom,
+                **self._lazy_params)
+        return self._lazy_instance
+
+    def _link(self):
+        """Create deferred M2M relations."""
+        instance = self.materialize()
+        m2m, self._lazy_m2m = self._lazy_m2m, {}
+        post_actions = self._lazy_object_manager._create_dependencies(
+            self._lazy_model, m2m)
+        for action in post_actions:
+            action(instance)
+
+    def __getattr__(self, item):
+        """Read plain field values without creating the object."""
+        if item.startswith('_lazy_'):
+            raise AttributeError(item)
+        if self._lazy_instance is None and item in self._lazy_fields:
+            return getattr(self._lazy_preview, item)
+        if item in self._lazy_m2m:
+            self._link()
+        return getattr(self.materialize(), item)
+
+    def __setattr__(self, item, value):
+        """Write plain field values without creating the object."""
+        if item.startswith('_lazy_'):
+            object.__setattr__(self, item, value)
+        elif self._lazy_instance is None and item in self._lazy_fields:
+            setattr(self._lazy_preview, item, value)
+            self._lazy_params[item] = value
+        else:
+            setattr(self.materialize(), item, value)
+
+    def __eq__(self, other):
+        """Compare created objects."""
+        if isinstance(other, LazyHandle):
+            other = other.materialize()
+        return self.materialize() == other
+
+    def __hash__(self):
+        """Hash created object."""
+        return hash(self.materialize())
+
+    def __repr__(self):
+        """Represent handle without creating the object."""
+        if self._lazy_instance is not None:
+            return repr(self._lazy_instance)
+        return f'<LazyHandle: {self._lazy_name} {self._lazy_key!r}>'
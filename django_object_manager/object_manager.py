@@ -1,9 +1,52 @@
-from collections import namedtuple, defaultdict
-from copy import copy
+import asyncio
+import hashlib
+import re
+import threading
+from collections import ChainMap, namedtuple, defaultdict
+from contextlib import contextmanager
+from copy import copy, deepcopy
+from functools import partial, reduce
+from itertools import islice
+from operator import or_
 
-from django.db.models import ManyToManyRel, ManyToManyField
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import ManyToManyRel, ManyToManyField, Model, Q
+from django.db.models.signals import post_migrate
 
-from .field_converters import default_converters
+from .backends import get_backend
+from .batch import Batch, bulk_delete
+from .cache import CompactCache, CompactLog
+from .field_converters import (
+    create_one2one,
+    default_converters,
+    post_action_queries,
+)
+from .lazy import LazyHandle
+from .registries import FileRegistry, LazyRegistry, Sequence, SequencePks
+from .scenarios import Scenario
+from .snapshot import Snapshot
+from .stats import no_stats
+from .tracking import mark_saved
+
+
+# Guards lazily computed registry caches, shared by threads
+_registry_lock = threading.RLock()
+
+
+def _sync_to_async(func):
+    try:
+        from asgiref.sync import sync_to_async
+    except ImportError:
+        raise ImportError('asgiref is required for async accessors') from None
+    return sync_to_async(func)
+
+
+def _async_to_sync(func):
+    try:
+        from asgiref.sync import async_to_sync
+    except ImportError:
+        raise ImportError('asgiref is required for async converters') from None
+    return async_to_sync(func)
 
 
 class ContextCallable:
@@ -21,47 +64,598 @@ class ContextCallable:
                                                      **kwargs)
 
 
+class AsyncContextCallable(ContextCallable):
+    """Callable helper, which returns coroutine creating object(s)."""
+
+    async def __call__(self, *args, **kwargs):
+        """Create object(s) asynchronously."""
+        return await self.object_manager.acall_with_context(self.context,
+                                                            *args,
+                                                            **kwargs)
+
+
 class ObjectManager:
     """Base class for test objects creation."""
 
-    Context = namedtuple('Context', 'name many')
+    Context = namedtuple('Context', 'name many build')
+    ModelPlan = namedtuple('ModelPlan', 'fields m2m_names')
+    Plan = namedtuple('Plan', 'inserts queries')
+    Ambiguous = namedtuple('Ambiguous', 'name')
     _data = {}
     _registered_models = {}
+    _model_names = {}
+    _lookups = {}
+    _backends = {}
+    _accessors = {}
+    _converters = copy(default_converters)
+    _dispatch = {}
+    _plans = {}
+    _snapshots = {}
+    _orders = {}
+    _prewarmed = {}
+    _scenarios = {}
+    _version = 0
+    _compiled = None
+    _frozen = False
+    default_stats = None
+    _registry_attributes = ('_data', '_registered_models', '_model_names',
+                            '_lookups', '_backends', '_accessors',
+                            '_converters', '_prewarmed', '_scenarios')
+    _cache_attributes = ('_dispatch', '_plans', '_orders')
+
+    def __init_subclass__(cls, **kwargs):
+        """Chain registrations, so that subclass registrations are isolated.
 
-    def __init__(self):
-        """Initialize object creator."""
-        self._instances = defaultdict(dict)
-        self._converters = copy(default_converters)
+        Subclass sees registrations of parent classes, including later ones,
+        its own registrations are not visible to parents.
+        """
+        super().__init_subclass__(**kwargs)
+        for name in cls._registry_attributes:
+            parent = getattr(cls, name)
+            maps = parent.maps if isinstance(parent, ChainMap) else [parent]
+            setattr(cls, name, ChainMap({}, *maps))
+        for name in cls._cache_attributes:
+            setattr(cls, name, {})
+        cls._version = 0
+        cls._compiled = None
+        cls._frozen = False
+
+    def __init__(self, lazy=False, stats=None, memoize=False, reuse=False,
+                 compact=False, cache_size=256):
+        """Initialize object creator.
+
+        In lazy mode `get_<name>` accessors return `LazyHandle`, which
+        creates the object when its primary key is needed. With `memoize`
+        objects with overridden or unregistered params are cached too, so
+        that identical calls return the same object. With `reuse` registered
+        objects are loaded from the database by their lookup fields (see
+        `register`) and only missing ones are created. In `compact` mode only
+        primary keys of created objects and `cache_size` recently used
+        instances are kept in memory. Creation costs are collected into
+        `stats` (`FixtureStats`), which defaults to
+        `ObjectManager.default_stats`.
+        """
+        if not self._is_compiled():
+            self.compile()
+        self._stats = self.default_stats if stats is None else stats
+        self._lazy = lazy
+        self._memoize = memoize
+        self._memo = {}
+        self._reuse = reuse
+        self._looked_up = set()
+        self._compact = compact
+        self._cache_size = cache_size
+        self._handles = defaultdict(dict)
+        self._instances = self._new_instances()
+        # Prewarmed objects are loaded instead of inserted
+        self._pks = dict(self._prewarmed)
+        self._streamed = {}
+        self._raw_inserted = defaultdict(list)
+        self._batch = None
+        self._flushing = None
+        self._deferred = {}
+        self._pending = {}
+        self._inserted = self._new_log()
+        self._build = False
+        self._built = defaultdict(dict)
 
     @classmethod
-    def register(cls, model, data):
-        """Register model, which supports creation using data.keys()."""
-        name = model.__name__.lower()
+    def register(cls, model, data, plural=None, lookup=None, backend=None):
+        """Register model, which supports creation using data.keys().
+
+        Objects are created by `get_<name>` and `get_<plural>` accessors,
+        plural defaults to `<name>s` (and `<name>ies` for names ending in y).
+        Name is lowercase model name, accessors with `<app_label>_` prefix
+        are always available. If models of several apps have the same name,
+        only prefixed accessors can be used.
+        `build_<name>` and `build_<plural>` accessors create unsaved objects,
+        `aget_<name>` and `aget_<plural>` are async versions of `get_`.
+        `lookup` fields identify existing rows, which are reused by
+        `ObjectManager(reuse=True)`. Insert `backend` (e.g. `'raw'`) makes
+        `get_<plural>` insert rows directly and return primary keys.
+        """
+        cls._check_mutable()
+        name = cls._model_names.get(model)
+        bare = model._meta.model_name
+        prefix = cls._prefix(model)
+        if name is None:
+            name = bare
+            if name in cls._registered_models:
+                # Model of another app with the same name
+                name = f'{prefix}_{name}'
+            cls._model_names[model] = name
         cls._data[name] = data
         cls._registered_models[name] = model
+        # None hides registration of parent class
+        cls._lookups[name] = tuple(lookup) if lookup else None
+        cls._backends[name] = None if backend is None else get_backend(backend)
+        cls._plans.pop(model, None)
+        cls._orders = {}
+        cls._version += 1
+        singulars = {f'{prefix}_{bare}': plural and f'{prefix}_{plural}'}
+        if name == bare:
+            singulars = {bare: plural, **singulars}
+        for singular, singular_plural in singulars.items():
+            if singular_plural is not None:
+                plurals = [singular_plural]
+            else:
+                plurals = [f'{singular}s']
+                if singular.endswith('y'):
+                    plurals.append(f'{singular[:-1]}ies')
+            for accessor, build in (('get', False), ('build', True)):
+                cls._accessors[f'{accessor}_{singular}'] = \
+                    cls.Context(name=name, many=False, build=build)
+                for plural_name in plurals:
+                    cls._accessors[f'{accessor}_{plural_name}'] = \
+                        cls.Context(name=name, many=True, build=build)
+        if name != bare:
+            # Unprefixed accessors of the first model are ambiguous now
+            first_prefix = cls._prefix(cls._registered_models[bare])
+            for accessor_name, context in list(cls._accessors.items()):
+                item = accessor_name.partition('_')[2]
+                if isinstance(context, cls.Context) and \
+                        context.name == bare and \
+                        not item.startswith(f'{first_prefix}_'):
+                    cls._accessors[accessor_name] = cls.Ambiguous(name=bare)
+
+    @staticmethod
+    def _prefix(model):
+        """Return accessor prefix of model app label."""
+        return re.sub(r'\W', '_', model._meta.app_label)
+
+    @classmethod
+    def _resolve_name(cls, item):
+        """Return registered name of `get_<item>` accessor."""
+        context = cls._accessors.get(f'get_{item}')
+        if context is None:
+            raise RuntimeError(f'Unknown item: {item}, choices are: '
+                               f'{cls._registered_models.keys()}')
+        if isinstance(context, cls.Ambiguous):
+            raise cls._ambiguous(item, context)
+        return context.name
+
+    @classmethod
+    def _ambiguous(cls, item, context):
+        choices = [f'{cls._prefix(model)}_{context.name}'
+                   for model in cls._model_names
+                   if model._meta.model_name == context.name]
+        return RuntimeError(f'Ambiguous item: {item}, models of several apps '
+                            f'are named {context.name}, use one of: '
+                            f'{", ".join(choices)}')
+
+    @classmethod
+    def register_sequence(cls, model, template, factory, count,
+                          chunk_size=1000, plural=None, backend=None):
+        """Register `count` objects, generated on demand.
+
+        Keys are `template.format(n=n)`, params are `factory(n)`.
+        `get_<plural>()` inserts objects in chunks of `chunk_size` with bulk
+        inserts (or `backend`) and returns list of their primary keys,
+        objects are not kept in memory.
+        """
+        cls.register(model, Sequence(template, factory, count, chunk_size),
+                     plural=plural, backend=backend)
+
+    @classmethod
+    def register_file(cls, model, path, plural=None):
+        """Register objects from JSON or YAML `{key: params}` file.
+
+        Relative path is resolved against current directory. File is parsed
+        on first use, parsed data is cached next to it.
+        """
+        cls.register(model, FileRegistry(path), plural=plural)
 
     @classmethod
     def register_converter(cls, field_type, converter):
         """Register new converter."""
+        cls._check_mutable()
         cls._converters[field_type] = converter
+        cls._dispatch.clear()
+        cls._plans.clear()
+        cls._orders = {}
+        cls._version += 1
 
-    def __getattribute__(self, item):
-        """Set context for object creation."""
-        if not item.startswith('get_'):
-            return super().__getattribute__(item)
-        name = item.split('_', 1)[1]
-        if name.endswith('s') and name[:-1] in self._registered_models:
-            return self.with_context(self.Context(name=name[:-1], many=True))
-        elif name.endswith('ies') and \
-                f'{name[:-3]}y' in self._registered_models:
-            return self.with_context(self.Context(name=f'{name[:-3]}y', many=True))
-        elif name in self._registered_models:
-            return self.with_context(self.Context(name=name, many=False))
-        else:
+    @classmethod
+    def _check_mutable(cls):
+        if cls._frozen:
+            raise RuntimeError(f'{cls.__name__} registry is frozen')
+
+    @classmethod
+    def freeze(cls):
+        """Compile registry and forbid further registrations.
+
+        Frozen registry is only read, so that object managers can be used
+        from threads and forked processes. It no longer follows registrations
+        of parent classes.
+        """
+        with _registry_lock:
+            for name in cls._registry_attributes:
+                value = getattr(cls, name)
+                if isinstance(value, ChainMap):
+                    setattr(cls, name, dict(value))
+            cls.compile()
+            for model in cls._registered_models.values():
+                cls._get_plan(model)
+            cls._frozen = True
+
+    @classmethod
+    def _registry_version(cls):
+        """Return versions of own and parent registrations."""
+        return tuple(klass.__dict__['_version'] for klass in cls.__mro__
+                     if '_version' in klass.__dict__)
+
+    @classmethod
+    def _is_compiled(cls):
+        # Frozen registry does not change, it was compiled when frozen
+        return cls._frozen or cls._compiled == cls._registry_version()
+
+    @classmethod
+    def prewarm(cls, fixtures):
+        """Insert objects, selected like in `load_fixtures`, ahead of tests.
+
+        Object managers, created later by this or forked processes, load
+        prewarmed objects by primary key instead of inserting them. Rows are
+        reused by lookup fields, when database is kept between runs.
+        """
+        object_manager = cls(reuse=True)
+        object_manager.load_fixtures(fixtures)
+        for name, instances in object_manager._instances.items():
+            prewarmed = dict(cls._prewarmed.get(name, {}))
+            prewarmed.update((key, instance.pk)
+                             for key, instance in instances.items())
+            cls._prewarmed[name] = prewarmed
+
+    @classmethod
+    def prewarm_on_migrate(cls, fixtures, using=DEFAULT_DB_ALIAS):
+        """Prewarm test database once it is migrated.
+
+        Django clones migrated database for parallel test workers, so every
+        worker starts with prewarmed objects. Returns signal receiver.
+        """
+        def receiver(using, **kwargs):
+            if using == target and not done:
+                done.append(using)
+                cls.prewarm(fixtures)
+
+        target = using
+        done = []
+        post_migrate.connect(receiver, weak=False)
+        return receiver
+
+    @classmethod
+    def scenario(cls, name, base=None, **fixtures):
+        """Return named scenario, registering it if fixtures are given.
+
+        Scenario objects are selected like in `load_fixtures`, either by
+        registered names or by plural accessor names, e.g.
+        `ObjectManager.scenario('catalog', films='__all__')`. Scenario is
+        created on top of `base` scenario objects. Entered scenario
+        (`with ObjectManager.scenario('catalog') as object_manager:`) is
+        built in a savepoint, which is rolled back when it is left.
+        """
+        if base is not None or fixtures:
+            cls._check_mutable()
+            if base is not None and base not in cls._scenarios:
+                raise ValueError(f'Unknown base scenario: {base}')
+            cls._scenarios[name] = (base, fixtures)
+        elif name not in cls._scenarios:
+            raise RuntimeError(f'Unknown scenario: {name}, choices are: '
+                               f'{cls._scenarios.keys()}')
+        return Scenario(cls, name)
+
+    @classmethod
+    def compile(cls):
+        """Validate references between registered objects.
+
+        Also detects reference cycles and computes creation order of every
+        registered object. Called by `ObjectManager()` after registration.
+        """
+        with _registry_lock:
+            version = cls._registry_version()
+            if not cls._compiled or cls._compiled[1:] != version[1:]:
+                # Registrations of parent classes have changed, own ones
+                # drop their caches on registration
+                cls._dispatch.clear()
+                cls._plans.clear()
+            cls._orders = {}
+            errors = []
+            eager = {name: data for name, data in cls._data.items()
+                     if not isinstance(data, LazyRegistry)}
+            for name, data in eager.items():
+                model = cls._registered_models[name]
+                for key, params in data.items():
+                    try:
+                        references = list(cls._references(model, params))
+                    except ValueError as error:
+                        errors.append(f'{name} {key!r}: {error}')
+                        continue
+                    for field, ref_name, ref_key, _ in references:
+                        ref_data = cls._data.get(ref_name, {})
+                        if isinstance(ref_data, LazyRegistry):
+                            # Validated on creation, file is not read
+                            continue
+                        if ref_key not in ref_data:
+                            errors.append(f'{name} {key!r}: {field.name} '
+                                          f'references unknown {ref_name} '
+                                          f'{ref_key!r}')
+            if errors:
+                raise ValueError('Invalid references:\n' + '\n'.join(errors))
+            for name, data in eager.items():
+                for key in data:
+                    cls._creation_order(name, key, eager=True)
+            cls._compiled = version
+
+    @classmethod
+    def _references(cls, model, params):
+        """Yield registered objects referenced by params.
+
+        Yields `(field, name, key, dependency)`, dependencies are created
+        before the object itself. References to models, which are not
+        registered, raise `ValueError`.
+        """
+        for field_name, (field, converter) in \
+                cls._get_plan(model).fields.items():
+            value = params.get(field_name)
+            if value is None or converter not in default_converters.values():
+                continue
+            name = cls._name_of(field.related_model)
+            dependency = converter is not create_one2one
+            for item in value if isinstance(value, (list, tuple)) \
+                    else [value]:
+                if isinstance(item, str):
+                    if name is None:
+                        raise ValueError(
+                            f'{field.name} references unregistered model '
+                            f'{field.related_model._meta.label}')
+                    yield field, name, item, dependency
+
+    @classmethod
+    def _dependencies(cls, name, key):
+        try:
+            params = cls._data[name][key]
+        except KeyError:
+            raise ValueError(f'Unknown reference: {name} {key!r}') from None
+        return [(ref_name, ref_key) for _, ref_name, ref_key, dependency
+                in cls._references(cls._registered_models[name], params)
+                if dependency]
+
+    @classmethod
+    def _creation_order(cls, name, key, eager=False):
+        """Return registered objects to create, ending with the given one.
+
+        With `eager` lazy registries are not read, `None` is returned for
+        objects, which depend on them.
+        """
+        orders = cls._orders
+        root = (name, key)
+        if root in orders:
+            return orders[root]
+        path = [root]
+        stack = [iter(cls._dependencies(*root))]
+        while stack:
+            for dependency in stack[-1]:
+                if dependency in orders:
+                    continue
+                if eager and isinstance(cls._data[dependency[0]],
+                                        LazyRegistry):
+                    return None
+                if dependency in path:
+                    cycle = path[path.index(dependency):] + [dependency]
+                    raise ValueError('Reference cycle: ' + ' -> '.join(
+                        f'{ref_name} {ref_key!r}'
+                        for ref_name, ref_key in cycle))
+                path.append(dependency)
+                stack.append(iter(cls._dependencies(*dependency)))
+                break
+            else:
+                stack.pop()
+                node = path.pop()
+                order = {}
+                for dependency in cls._dependencies(*node):
+                    order.update(dict.fromkeys(orders[dependency]))
+                order[node] = None
+                orders[node] = tuple(order)
+        return orders[root]
+
+    @classmethod
+    def _get_plan(cls, model):
+        """Return cached converters of model fields and M2M field names."""
+        try:
+            return cls._plans[model]
+        except KeyError:
+            pass
+        fields = {}
+        m2m_names = set()
+        for field in model._meta.get_fields():
+            if isinstance(field, (ManyToManyField, ManyToManyRel)):
+                m2m_names.add(field.name)
+            converter = cls._converter_for(type(field))
+            if converter is not None:
+                fields[field.name] = (field, converter)
+        plan = cls._plans[model] = cls.ModelPlan(fields=fields,
+                                                 m2m_names=m2m_names)
+        return plan
+
+    @classmethod
+    def _converter_for(cls, field_type):
+        """Return converter of the closest registered base of field type."""
+        try:
+            return cls._dispatch[field_type]
+        except KeyError:
+            pass
+        converter = cls._dispatch[field_type] = next(
+            (cls._converters[base] for base in field_type.__mro__
+             if base in cls._converters),
+            None)
+        return converter
+
+    @classmethod
+    def _name_of(cls, model):
+        """Return registered name of model, resolved by type, or `None`."""
+        try:
+            return cls._model_names[model]
+        except KeyError:
+            return cls._model_names.get(model._meta.concrete_model)
+
+    def __getattr__(self, item):
+        """Return creation accessor, bound to model context."""
+        asynchronous = item.startswith('aget_')
+        try:
+            context = self._accessors[item[1:] if asynchronous else item]
+        except KeyError:
+            if not item.startswith(('get_', 'build_', 'aget_')):
+                raise AttributeError(item) from None
             raise RuntimeError(f'Unknown item: {item}, choices are: '
-                               f'{self._registered_models.keys()}')
+                               f'{self._registered_models.keys()}') from None
+        if isinstance(context, self.Ambiguous):
+            raise self._ambiguous(item, context)
+        # Cache accessor, so that further lookups skip __getattr__
+        accessor = self.__dict__[item] = self.with_context(context,
+                                                           asynchronous)
+        return accessor
+
+    def __dir__(self):
+        """Include creation accessors."""
+        accessors = {name for name, context in self._accessors.items()
+                     if isinstance(context, self.Context)}
+        async_accessors = {f'a{name}' for name in accessors
+                           if name.startswith('get_')}
+        return sorted(set(super().__dir__()) | accessors | async_accessors)
+
+    @contextmanager
+    def batch(self):
+        """Defer inserts, flush them with one bulk insert per model on exit.
+
+        Objects returned inside the batch have no primary key until the
+        outermost batch exits. Nested batches join the outer one.
+        """
+        if self._batch is not None:
+            yield
+            return
+        batch = self._batch = Batch(self._inserted, self._measure_deferred)
+        try:
+            try:
+                yield
+            finally:
+                self._batch = None
+            self._flush(batch)
+        except BaseException:
+            # Instances of failed batch may be unsaved or rolled back
+            self._forget(batch.instances())
+            raise
+        if self._compact:
+            for cached in self._instances.values():
+                cached.settle()
+
+    def _flush(self, batch):
+        """Flush batch, M2M links of post actions are added to it."""
+        instances = batch.instances()
+        self._flushing = batch
+        try:
+            batch.flush()
+        finally:
+            self._flushing = None
+            costs = [self._deferred.pop(id(instance), None)
+                     for instance in instances]
+        for cost in costs:
+            if cost is not None:
+                cost.send()
+
+    @contextmanager
+    def _building(self):
+        """Create unsaved objects, see `build_<name>` accessors."""
+        self._build = True
+        try:
+            yield
+        finally:
+            self._build = False
+
+    def _new_instances(self):
+        if self._compact:
+            return CompactCache(self._registered_models, self._cache_size)
+        return defaultdict(dict)
+
+    def _new_log(self):
+        return CompactLog() if self._compact else []
+
+    def _record(self, instances):
+        """Record inserted rows in insertion order."""
+        self._inserted.extend(instances)
+
+    def _record_raw(self, model, pks):
+        """Record primary keys of rows, inserted without instances."""
+        self._raw_inserted[model].extend(pks)
+
+    def cleanup(self):
+        """Delete all rows, inserted by object manager.
 
-    def with_context(self, context):
+        Rows are deleted with one query per model, referencing models first,
+        without cascades and signals. Faster alternative to database flush
+        of `TransactionTestCase`, when test data comes from object manager.
+        """
+        if self._compact:
+            rows = self._inserted.links
+            pks = {model: list(model_pks)
+                   for model, model_pks in self._inserted.pks.items()}
+        else:
+            rows = self._inserted
+            pks = {}
+        for name, streamed in self._streamed.items():
+            model = self._get_model(name)
+            pks[model] = pks.get(model, []) + streamed
+        for model, raw_pks in self._raw_inserted.items():
+            pks[model] = pks.get(model, []) + raw_pks
+        bulk_delete(rows, pks)
+        self._inserted = self._new_log()
+        self._instances = self._new_instances()
+        self._handles = defaultdict(dict)
+        self._pks = dict(self._prewarmed)
+        self._streamed = {}
+        self._raw_inserted = defaultdict(list)
+        self._memo = {}
+        self._looked_up = set()
+
+    def _seed(self, instances):
+        """Cache copies of `{name: {key: instance}}` created objects."""
+        # Tests may modify seeded objects in memory
+        for name, cached in deepcopy(instances).items():
+            self._instances[name].update(cached)
+
+    def _forget(self, instances):
+        ids = {id(instance) for instance in instances}
+        for cached in self._instances.values():
+            # Compact cache keeps only pending instances in memory
+            candidates = cached.unsaved if self._compact else cached
+            for key in [key for key, instance in candidates.items()
+                        if id(instance) in ids]:
+                del cached[key]
+        for memo_key in [memo_key for memo_key, instance in self._memo.items()
+                         if id(instance) in ids]:
+            del self._memo[memo_key]
+
+    def with_context(self, context, asynchronous=False):
+        if asynchronous:
+            return AsyncContextCallable(self, context)
         return ContextCallable(self, context)
 
     def __call__(self, *args, **kwargs):
@@ -70,84 +664,641 @@ class ObjectManager:
             'object_manager() instead of object_manager.get_`model_name`()')
 
     def call_with_context(self, context, *args, **kwargs):
+        with self._measure('calls', context):
+            return self._call(context, *args, **kwargs)
+
+    def _call(self, context, *args, **kwargs):
+        if context.build and not self._build:
+            with self._building():
+                return self._call(context, *args, **kwargs)
         if context.many and (args or kwargs):
             raise ValueError('Multiple item creation needs no args')
-        if context.many:
-            return {key: self._get_or_create(context.name, key, **data)
+        if context.many and self._lazy and not context.build:
+            return {key: self._get_handle(context.name, key, False, data)
                     for key, data in self._data[context.name].items()}
+        if context.many and not context.build and \
+                isinstance(self._data[context.name], Sequence):
+            return self._stream(context.name)
+        if context.many and not context.build and \
+                self._backends.get(context.name) is not None:
+            return self._insert_with(self._backends[context.name],
+                                     context.name,
+                                     list(self._data[context.name]))
+        if context.many:
+            self._request(context.name, self._data[context.name])
+            self._find_existing(self._closure(context.name,
+                                              self._data[context.name]))
+            created = self._cached_many(context.name,
+                                        self._data[context.name])
+            with self.batch():
+                return {key: created[key] if key in created else
+                        self._get_or_create(context.name, key, **data)
+                        for key, data in self._data[context.name].items()}
         else:
-            try:
-                (key,) = args
-                item_data = self._data[context.name][key].copy()
-                item_data.update(kwargs)
-                params = item_data
-                custom = self._is_custom(self._get_model(context.name),
-                                         **kwargs)
-            except ValueError:
-                key = None
-                params = kwargs
-                custom = False
-            return self._get_or_create(context.name, key,
-                                       _custom=custom,
-                                       **params)
+            key, params, custom = self._call_params(context, args, kwargs)
+            if self._stats is not None and key is not None:
+                self._stats.use(context.name, key)
+            memo_key = self._memo_key(context, key, params, custom)
+            if memo_key in self._memo:
+                return self._memo[memo_key]
+            if self._lazy and not context.build:
+                result = self._get_handle(context.name, key, custom, params)
+            else:
+                result = self._get_or_create(context.name, key,
+                                             _custom=custom,
+                                             **params)
+            if memo_key is not None:
+                self._memo[memo_key] = result
+            return result
+
+    def _call_params(self, context, args, kwargs):
+        """Return key, params and custom flag of single object creation."""
+        try:
+            (key,) = args
+            item_data = self._data[context.name][key].copy()
+            item_data.update(kwargs)
+            params = item_data
+            custom = self._is_custom(self._get_model(context.name),
+                                     **kwargs)
+        except ValueError:
+            key = None
+            params = kwargs
+            custom = False
+        return key, params, custom
+
+    def _memo_key(self, context, key, params, custom):
+        """Return memoization key of not cached object or `None`."""
+        if not self._memoize or (key is not None and not custom):
+            return None
+        fields = self._get_plan(self._get_model(context.name)).fields
+        references = {name: self._name_of(field.related_model)
+                      for name, (field, _) in fields.items()
+                      if field.is_relation}
+        normalized = sorted(
+            (name, self._normalized(value, references.get(name)))
+            for name, value in params.items())
+        digest = hashlib.sha1(repr(normalized).encode()).hexdigest()
+        return context.name, context.build, digest
+
+    def _normalized(self, value, reference=None):
+        """Replace objects in params with their keys or primary keys."""
+        if reference is not None and isinstance(value, str):
+            return 'key', reference, value
+        if isinstance(value, LazyHandle):
+            if value._lazy_custom or value._lazy_key is None:
+                return 'id', id(value)
+            return 'key', value._lazy_name, value._lazy_key
+        if isinstance(value, Model):
+            name = self._name_of(type(value))
+            cached = self._cache().get(name, {})
+            if self._compact and not self._build:
+                key = cached.key_of(value) if cached else None
+                if key is not None:
+                    return 'key', name, key
+            else:
+                for key, instance in cached.items():
+                    if instance is value:
+                        return 'key', name, key
+            if value.pk is None:
+                return 'id', id(value)
+            return 'pk', value._meta.label, value.pk
+        if isinstance(value, (list, tuple)):
+            return tuple(self._normalized(item, reference) for item in value)
+        if isinstance(value, (set, frozenset)):
+            return tuple(sorted((self._normalized(item, reference)
+                                 for item in value),
+                                key=repr))
+        if isinstance(value, dict):
+            return tuple(sorted((item_key, self._normalized(item))
+                                for item_key, item in value.items()))
+        return value
+
+    async def acall_with_context(self, context, *args, **kwargs):
+        """Create object(s) like `call_with_context`, awaiting queries.
+
+        Independent dependencies are created concurrently. Lazy mode and
+        stats do not apply to async accessors.
+        """
+        if context.many and (args or kwargs):
+            raise ValueError('Multiple item creation needs no args')
+        data = self._data[context.name]
+        if context.many and isinstance(data, Sequence):
+            return await _sync_to_async(self._stream)(context.name)
+        if context.many:
+            instances = await asyncio.gather(*(
+                self._aget_or_create(context.name, key, **params)
+                for key, params in data.items()))
+            return dict(zip(data, instances))
+        key, params, custom = self._call_params(context, args, kwargs)
+        memo_key = self._memo_key(context, key, params, custom)
+        if memo_key in self._memo:
+            return self._memo[memo_key]
+        instance = await self._aget_or_create(context.name, key,
+                                              _custom=custom,
+                                              **params)
+        if memo_key is not None:
+            self._memo[memo_key] = instance
+        return instance
+
+    def plan(self, name, key):
+        """Return objects, which `get_<name>(key)` inserts, in order.
+
+        Also returns expected number of queries. Objects, which were
+        already created, are not included.
+        """
+        inserts = [node for node in self._creation_order(name, key)
+                   if self._get(*node) is None]
+        return self.Plan(inserts=inserts,
+                         queries=sum(self._expected_queries(*node)
+                                     for node in inserts))
+
+    def _expected_queries(self, name, key):
+        params = self._data[name][key]
+        queries = 1
+        for field_name, (field, converter) in \
+                self._get_plan(self._get_model(name)).fields.items():
+            if params.get(field_name) is not None:
+                queries += post_action_queries(field, converter,
+                                               params[field_name])
+        return queries
+
+    def _get_handle(self, name, key, custom, params):
+        cached = key is not None and not custom
+        if cached and key in self._handles[name]:
+            return self._handles[name][key]
+        handle = LazyHandle(self, name, key, custom, params)
+        if cached:
+            self._handles[name][key] = handle
+        return handle
+
+    def load_fixtures(self, fixtures):
+        """Create registered objects, selected by `{name: keys}` mapping.
+
+        Names are registered or accessor names (e.g. `film` or `films`), keys
+        are either list of registered ids or `'__all__'`, result is
+        `{name: {key: instance}}` mapping.
+        """
+        selected = self._selected(fixtures)
+        for _, name, keys in selected:
+            self._request(name, keys)
+        self._find_existing(node for _, name, keys in selected
+                            for node in self._closure(name, keys))
+        with self.batch():
+            return {
+                item: {key: self._get_or_create(name, key,
+                                                **self._data[name][key])
+                       for key in keys}
+                for item, name, keys in selected}
+
+    def insert(self, fixtures, backend=None):
+        """Insert registered objects, selected like in `load_fixtures`.
+
+        Objects are inserted by `backend`, which defaults to the registered
+        backend of each model (model instances, if there is none). Result is
+        `{name: {key: pk}}` mapping, instances are loaded on demand.
+        """
+        result = {}
+        for item, name, keys in self._selected(fixtures):
+            self._request(name, keys)
+            name_backend = get_backend(backend) or self._backends.get(name)
+            if name_backend is not None:
+                result[item] = self._insert_with(name_backend, name, keys)
+                continue
+            with self.batch():
+                instances = {key: self._get_or_create(name, key,
+                                                      **self._data[name][key])
+                             for key in keys}
+            result[item] = {key: instance.pk
+                            for key, instance in instances.items()}
+        return result
+
+    def _insert_with(self, backend, name, keys):
+        """Insert objects by backend, return `{key: pk}` mapping."""
+        pks = {}
+        known = self._pks.get(name, {})
+        for key in keys:
+            if key in self._instances[name]:
+                pks[key] = self._instances[name][key].pk
+            elif known.get(key) is not None:
+                pks[key] = known.get(key)
+        new = [key for key in keys if key not in pks]
+        inserted = dict(zip(new, backend.insert(
+            self, self._get_model(name),
+            [dict(self._data[name][key]) for key in new])))
+        if inserted and not isinstance(known, SequencePks):
+            # Prewarmed mapping is shared, it is copied on update
+            self._pks[name] = {**known, **inserted}
+        pks.update(inserted)
+        return {key: pks[key] for key in keys}
+
+    def load_snapshot(self, fixtures):
+        """Create objects like `load_fixtures`, using cached rows.
+
+        Objects are created once per process, further calls insert recorded
+        rows directly. Cached rows are dropped when registrations change.
+        Object manager must not have created selected objects yet.
+        """
+        snapshot_key = (self._fingerprint(), repr(sorted(fixtures.items())))
+        if snapshot_key not in self._snapshots:
+            self._snapshots[snapshot_key] = Snapshot.capture(type(self)(),
+                                                             fixtures)
+        self._snapshots[snapshot_key].restore(self)
+        return {item: {key: self._instances[name][key] for key in keys}
+                for item, name, keys in self._selected(fixtures)}
+
+    @classmethod
+    def _fingerprint(cls):
+        """Return hash of registered data and converters."""
+        registry = [(name, cls._registered_models[name]._meta.label,
+                     cls._data[name])
+                    for name in sorted(cls._data)]
+        return hashlib.sha1(
+            repr((registry, cls._converters)).encode()).hexdigest()
+
+    def _selected(self, fixtures):
+        """Return `(item, name, keys)` of `{item: keys}` fixtures."""
+        selected = []
+        for item, keys in fixtures.items():
+            name = self._resolve_name(item)
+            selected.append((item, name, list(self._data[name])
+                             if keys == '__all__' else keys))
+        return selected
 
     def _get_model(self, name):
         return self._registered_models[name]
 
     def _is_custom(self, model, **kwargs):
-        fields = {field.name: field for field in model._meta.get_fields()}
-        for name in kwargs:
-            if not isinstance(fields[name], (ManyToManyField, ManyToManyRel)):
-                return True
-        return False
+        m2m_names = self._get_plan(model).m2m_names
+        return any(name not in m2m_names for name in kwargs)
+
+    def _cached_many(self, name, keys):
+        """Return created objects of keys, loaded with one query."""
+        if not self._compact or self._build:
+            return {}
+        return self._instances[name].get_many(keys)
+
+    def _cache(self):
+        return self._built if self._build else self._instances
+
+    def _stream(self, name):
+        """Insert sequence objects in chunks, return their primary keys."""
+        if name in self._streamed:
+            return self._streamed[name]
+        sequence = self._data[name]
+        model = self._get_model(name)
+        cached = self._instances[name]
+        backend = self._backends.get(name)
+        pks = []
+        keys = iter(sequence)
+        chunk = list(islice(keys, sequence.chunk_size))
+        while chunk and backend is not None:
+            new = [key for key in chunk if key not in cached]
+            inserted = dict(zip(new, backend.insert(
+                self, model, [sequence[key] for key in new])))
+            pks.extend(inserted[key] if key in inserted else cached[key].pk
+                       for key in chunk)
+            chunk = list(islice(keys, sequence.chunk_size))
+        while chunk:
+            # Objects of the sequence are neither cached nor recorded
+            inserted = []
+            outer, self._batch = self._batch, Batch(inserted,
+                                                    self._measure_deferred)
+            try:
+                instances = [
+                    cached[key] if key in cached else
+                    self._get_or_create(name, key, _custom=True,
+                                        **sequence[key])
+                    for key in chunk]
+                self._flush(self._batch)
+            finally:
+                self._batch = outer
+            self._record([instance for instance in inserted
+                          if type(instance) is not model])
+            pks.extend(instance.pk for instance in instances)
+            chunk = list(islice(keys, sequence.chunk_size))
+        self._streamed[name] = pks
+        self._pks[name] = SequencePks(sequence, pks)
+        return pks
+
+    def _closure(self, name, keys):
+        """Return registered objects, which creation of keys may insert."""
+        if not self._reuse or isinstance(self._data[name], Sequence):
+            return [(name, key) for key in keys]
+        nodes = {}
+        for key in keys:
+            nodes.update(dict.fromkeys(self._creation_order(name, key)))
+        return list(nodes)
+
+    def _find_existing(self, nodes):
+        """Load existing rows of registered objects by lookup fields.
+
+        Issues one query per model, found rows are cached by their keys.
+        """
+        if not self._reuse or self._build:
+            return
+        wanted = defaultdict(list)
+        for name, key in nodes:
+            if self._lookups.get(name) and (name, key) not in self._looked_up \
+                    and key not in self._instances[name]:
+                self._looked_up.add((name, key))
+                wanted[name].append(key)
+        for name, keys in wanted.items():
+            model = self._get_model(name)
+            fields = [model._meta.get_field(field_name)
+                      for field_name in self._lookups[name]]
+            keys_by_values = defaultdict(list)
+            for key in keys:
+                params = self._data[name][key]
+                if all(field.name in params for field in fields):
+                    values = tuple(field.to_python(params[field.name])
+                                   for field in fields)
+                    keys_by_values[values].append(key)
+            if not keys_by_values:
+                continue
+            if len(fields) == 1:
+                condition = Q(**{f'{fields[0].name}__in':
+                                 [values for values, in keys_by_values]})
+            else:
+                condition = reduce(or_, (
+                    Q(**{field.name: value
+                         for field, value in zip(fields, values)})
+                    for values in keys_by_values))
+            rows = list(model._default_manager.filter(condition))
+            mark_saved(rows)
+            for row in rows:
+                values = tuple(getattr(row, field.attname)
+                               for field in fields)
+                for key in keys_by_values.pop(values, ()):
+                    self._instances[name][key] = row
 
     def _get(self, _name, _key):
-        if _key in self._instances[_name]:
-            return self._instances[_name][_key]
+        cache = self._cache()
+        if _key in cache[_name]:
+            return cache[_name][_key]
+        if self._reuse and not self._build and self._lookups.get(_name):
+            self._find_existing([(_name, _key)])
+            if _key in cache[_name]:
+                return cache[_name][_key]
+        if not self._build and _name in self._pks:
+            # Object was inserted, but is not kept in memory
+            pk = self._pks[_name].get(_key)
+            if pk is not None:
+                model = self._get_model(_name)
+                instance = model._base_manager.filter(pk=pk).first()
+                if instance is not None:
+                    # Otherwise database was flushed, object is created
+                    cache[_name][_key] = instance
+                    mark_saved([instance])
+                    return instance
         return None
 
+    def _create_references(self, model, params):
+        """Create referenced registered objects in precomputed order."""
+        references = []
+        for _, name, key, dependency in self._references(model, params):
+            if self._stats is not None:
+                self._stats.use(name, key)
+            if dependency:
+                references.append((name, key))
+        if self._reuse:
+            self._find_existing(node for reference in references
+                                for node in self._creation_order(*reference))
+        for name, key in references:
+            if self._get(name, key) is None:
+                for node_name, node_key in self._creation_order(name, key):
+                    self._get_or_create(node_name, node_key,
+                                        **self._data[node_name][node_key])
+
     def _create_dependencies(self, model, params):
+        self._create_references(model, params)
         post_actions = []
-        for field in model._meta.get_fields():
-            if field.name in params:
-                if params[field.name] is None:
-                    continue
-                for (converter_type, converter) in self._converters.items():
-                    if isinstance(field, converter_type):
-                        result = converter(self, field, params[field.name])
-                        post_actions.extend(result.post_actions)
-                        if not result.pass_field_value:
-                            params.pop(field.name)
-                        else:
-                            params[field.name] = result.field_value
-                        break
+        for name, (field, converter) in self._get_plan(model).fields.items():
+            if params.get(name) is None:
+                continue
+            with self._measure('converters', (model._meta.model_name, name)):
+                if asyncio.iscoroutinefunction(converter):
+                    result = _async_to_sync(converter)(self, field,
+                                                       params[name])
+                else:
+                    result = converter(self, field, params[name])
+            actions = [_async_to_sync(action)
+                       if asyncio.iscoroutinefunction(action) else action
+                       for action in result.post_actions]
+            if self._stats is None:
+                post_actions.extend(actions)
+            else:
+                post_actions.extend(
+                    partial(self._run_measured,
+                            (model._meta.model_name, name),
+                            action)
+                    for action in actions)
+            if not result.pass_field_value:
+                params.pop(name)
+            else:
+                params[name] = result.field_value
         return post_actions
 
+    def _measure(self, kind, key, model=None):
+        if self._stats is None:
+            return no_stats
+        return self._stats.measure(kind, key, model)
+
+    def _request(self, name, keys):
+        """Record fixtures, selected for creation, see `FixtureStats`."""
+        if self._stats is not None and \
+                not isinstance(self._data[name], Sequence):
+            self._stats.request(name, keys)
+
+    def _measure_deferred(self, instances):
+        """Measure batched inserts or post actions of created fixtures."""
+        if self._stats is None:
+            return no_stats
+        return self._stats.measure_shared([
+            self._deferred[id(instance)] for instance in instances
+            if id(instance) in self._deferred])
+
+    def _run_measured(self, key, action, instance):
+        with self._stats.measure('post_actions', key):
+            action(instance)
+
     def _get_or_create(self, _name, _key, _create_in_db=True, _custom=False,
                        **kwargs):
         model = self._get_model(_name)
         instance = self._get(_name, _key)
         if instance is not None and not _custom:
             return instance
+        measurement = self._measure('fixtures',
+                                    (_name, None if _custom else _key), model)
+        with measurement:
+            instance = self._create(model, _name, _key, _create_in_db,
+                                    _custom, kwargs)
+        if self._stats is not None:
+            if _create_in_db and self._batch is not None and not self._build:
+                # Insert and post actions are measured on flush
+                self._deferred[id(instance)] = measurement.cost
+            else:
+                measurement.cost.send()
+        return instance
+
+    def _create(self, model, name, key, create_in_db, custom, kwargs):
         post_add = self._create_dependencies(model, kwargs)
-        if _create_in_db:
+        if create_in_db:
             instance = model(**kwargs)
-            instance.save(force_insert=True)
         else:
             return model(**kwargs)
+        if self._build:
+            for action in post_add:
+                action(instance)
+        elif self._batch is not None:
+            self._batch.add(instance, post_add)
+        else:
+            instance.save(force_insert=True)
+            mark_saved([instance])
+            self._record([instance])
+            for action in post_add:
+                action(instance)
+        if key is not None and not custom:
+            self._cache()[name][key] = instance
+        return instance
+
+    async def _aget_or_create(self, _name, _key, _custom=False, **kwargs):
+        model = self._get_model(_name)
+        if _custom or _key is None:
+            return await self._acreate(model, _name, _key, _custom, kwargs)
+        instance = None if self._compact else self._instances[_name].get(_key)
+        if instance is None and (self._compact or _name in self._pks or
+                                 self._reuse and self._lookups.get(_name)):
+            instance = await _sync_to_async(self._get)(_name, _key)
+        if instance is not None:
+            return instance
+        # Objects shared by concurrent branches are created once
+        node = (_name, _key)
+        task = self._pending.get(node)
+        if task is None:
+            task = self._pending[node] = asyncio.ensure_future(
+                self._acreate(model, _name, _key, _custom, kwargs))
+            task.add_done_callback(lambda _: self._pending.pop(node, None))
+        return await task
+
+    async def _acreate(self, model, name, key, custom, kwargs):
+        dependencies = dict.fromkeys(
+            (ref_name, ref_key) for _, ref_name, ref_key, dependency
+            in self._references(model, kwargs) if dependency)
+        for node in dependencies:
+            # Validates references of lazy registries
+            self._creation_order(*node)
+        await asyncio.gather(*(
+            self._aget_or_create(ref_name, ref_key,
+                                 **self._data[ref_name][ref_key])
+            for ref_name, ref_key in dependencies))
+        post_add = []
+        for field_name, (field, converter) in \
+                self._get_plan(model).fields.items():
+            if kwargs.get(field_name) is None:
+                continue
+            if asyncio.iscoroutinefunction(converter):
+                result = await converter(self, field, kwargs[field_name])
+            else:
+                result = await _sync_to_async(converter)(self, field,
+                                                         kwargs[field_name])
+            post_add.extend(result.post_actions)
+            if not result.pass_field_value:
+                kwargs.pop(field_name)
+            else:
+                kwargs[field_name] = result.field_value
+        instance = model(**kwargs)
+        if hasattr(instance, 'asave'):
+            await instance.asave(force_insert=True)
+        else:
+            await _sync_to_async(instance.save)(force_insert=True)
+        mark_saved([instance])
+        self._record([instance])
         for action in post_add:
-            action(instance)
-        if _key is not None and not _custom:
-            self._instances[_name][_key] = instance
+            if asyncio.iscoroutinefunction(action):
+                await action(instance)
+            else:
+                await _sync_to_async(action)(instance)
+        if key is not None and not custom:
+            self._instances[name][key] = instance
         return instance
 
 
 class ObjManagerMixin:
-    """Mixin for easy test object creation."""
+    """Mixin for easy test object creation.
+
+    With `object_manager_cleanup` inserted rows are deleted on tear down,
+    see `ObjectManager.cleanup`. Objects of `object_manager_scenario` (see
+    `ObjectManager.scenario`) are created once per test class.
+    """
 
     object_manager = None
+    object_manager_class = ObjectManager
+    object_manager_options = {}
+    object_manager_cleanup = False
+    object_manager_scenario = None
+    _object_manager_scenario = None
+
+    @classmethod
+    def setUpClass(cls):
+        """Enter scenario, if any, once per test class."""
+        super().setUpClass()
+        cls._object_manager_scenario = None
+        if cls.object_manager_scenario is not None:
+            scenario = cls.object_manager_class.scenario(
+                cls.object_manager_scenario)
+            try:
+                scenario.enter()
+            except BaseException:
+                super().tearDownClass()
+                raise
+            cls._object_manager_scenario = scenario
+
+    @classmethod
+    def tearDownClass(cls):
+        """Roll scenario objects back."""
+        if cls._object_manager_scenario is not None:
+            cls._object_manager_scenario.leave()
+        super().tearDownClass()
+
+    def setUp(self):
+        """Set test environment up."""
+        self.object_manager = self.object_manager_class(
+            **self.object_manager_options)
+        if self._object_manager_scenario is not None:
+            self._object_manager_scenario.seed(self.object_manager)
+        super().setUp()
+
+    def tearDown(self):
+        """Delete inserted rows, if enabled."""
+        if self.object_manager_cleanup:
+            self.object_manager.cleanup()
+        super().tearDown()
+
+
+class ObjManagerTestDataMixin(ObjManagerMixin):
+    """Mixin, which creates shared objects once per test class.
+
+    Objects selected by `object_manager_fixtures` (see
+    `ObjectManager.load_fixtures`) are created in `setUpTestData`, so it
+    must be used with `django.test.TestCase`. Every test gets its own copy
+    of shared objects, which are returned by `object_manager` without
+    queries.
+    """
+
+    object_manager_fixtures = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create shared objects."""
+        super().setUpTestData()
+        object_manager = cls.object_manager_class(
+            **cls.object_manager_options)
+        object_manager.load_fixtures(cls.object_manager_fixtures)
+        cls.object_manager_instances = {
+            name: dict(cached.items())
+            for name, cached in object_manager._instances.items()}
 
     def setUp(self):
         """Set test environment up."""
-        self.object_manager = ObjectManager()
         super().setUp()
+        self.object_manager._seed(self.object_manager_instances)
@@ -0,0 +1,31 @@
+"""Pytest plugin, which reports fixture creation costs.
+
+Plugin is opt-in, it is loaded with `-p django_object_manager.pytest_plugin`
+and enabled by `--object-manager-report` option.
+"""
+
+from .object_manager import ObjectManager
+from .stats import FixtureStats
+
+
+def pytest_addoption(parser):
+    """Add report option."""
+    parser.getgroup('django-object-manager').addoption(
+        '--object-manager-report',
+        action='store_true',
+        default=False,
+        help='Report the most expensive and unused object manager fixtures.')
+
+
+def pytest_configure(config):
+    """Collect stats of all object managers."""
+    if config.getoption('object_manager_report'):
+        ObjectManager.default_stats = FixtureStats()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """Write report."""
+    stats = ObjectManager.default_stats
+    if config.getoption('object_manager_report') and stats is not None:
+        terminalreporter.write_sep('-', 'object manager fixtures')
+        terminalreporter.write_line(stats.report())
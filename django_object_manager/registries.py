@@ -0,0 +1,174 @@
+"""Registrations, which produce object parameters lazily."""
+
+import hashlib
+import json
+import marshal
+import os
+import re
+from collections.abc import Mapping
+
+__all__ = ('FileRegistry', 'LazyRegistry', 'Sequence', 'SequencePks')
+
+CACHE_VERSION = 1
+
+
+class LazyRegistry(Mapping):
+    """Registered `{key: params}` mapping, which is evaluated on demand.
+
+    Lazy registries are not validated by `ObjectManager.compile()`,
+    references of their objects are resolved on creation.
+    """
+
+
+class Sequence(LazyRegistry):
+    """Generated keys `template.format(n=n)` with `factory(n)` params."""
+
+    def __init__(self, template, factory, count, chunk_size):
+        """Initialize sequence of `count` keys."""
+        self.template = template
+        self.factory = factory
+        self.count = count
+        self.chunk_size = chunk_size
+        prefix, _, suffix = template.partition('{n}')
+        self._pattern = re.compile(
+            re.escape(prefix) + r'(\d+)' + re.escape(suffix))
+
+    def index(self, key):
+        """Return number of key or `None` if key is not in sequence."""
+        match = self._pattern.fullmatch(key) if isinstance(key, str) else None
+        if match is None:
+            return None
+        number = int(match.group(1))
+        if number >= self.count or self.template.format(n=number) != key:
+            return None
+        return number
+
+    def __getitem__(self, key):
+        """Return params of key."""
+        number = self.index(key)
+        if number is None:
+            raise KeyError(key)
+        return self.factory(number)
+
+    def __contains__(self, key):
+        """Check key without params creation."""
+        return self.index(key) is not None
+
+    def __iter__(self):
+        """Iterate over keys."""
+        return (self.template.format(n=number) for number in range(self.count))
+
+    def __len__(self):
+        """Return number of keys."""
+        return self.count
+
+    def __repr__(self):
+        """Represent sequence without params creation."""
+        return (f'Sequence({self.template!r}, {self.factory!r}, '
+                f'count={self.count})')
+
+
+class SequencePks:
+    """Primary keys of sequence objects, inserted in key order."""
+
+    def __init__(self, sequence, pks):
+        """Initialize mapping of sequence keys to primary keys."""
+        self.sequence = sequence
+        self.pks = pks
+
+    def get(self, key, default=None):
+        """Return primary key of object with given key."""
+        number = self.sequence.index(key)
+        if number is None or number >= len(self.pks):
+            return default
+        return self.pks[number]
+
+
+class FileRegistry(LazyRegistry):
+    """Registered objects, loaded from JSON or YAML file on first access.
+
+    Parsed data is cached in `.<file name>.cache` file next to the source,
+    cache is reused while source modification time and size are the same or
+    its content hash matches.
+    """
+
+    def __init__(self, path):
+        """Initialize registry, file is not read yet."""
+        self.path = os.path.abspath(path)
+        directory, file_name = os.path.split(self.path)
+        self.cache_path = os.path.join(directory, f'.{file_name}.cache')
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            self._data = self._read()
+        return self._data
+
+    def _read(self):
+        stat = os.stat(self.path)
+        cached = None
+        try:
+            with open(self.cache_path, 'rb') as cache:
+                cached = marshal.load(cache)
+            version, mtime, size, digest, data = cached
+        except (OSError, EOFError, ValueError, TypeError):
+            cached = None
+        else:
+            if version == CACHE_VERSION and mtime == stat.st_mtime_ns and \
+                    size == stat.st_size:
+                return data
+        with open(self.path, 'rb') as source:
+            content = source.read()
+        new_digest = hashlib.sha1(content).hexdigest()
+        if cached is not None and version == CACHE_VERSION and \
+                digest == new_digest:
+            data = cached[4]
+        else:
+            data = self._parse(content)
+        try:
+            with open(self.cache_path, 'wb') as cache:
+                marshal.dump((CACHE_VERSION, stat.st_mtime_ns, stat.st_size,
+                              new_digest, data), cache)
+        except (OSError, ValueError):
+            # Read-only directory or data, which marshal does not support
+            pass
+        return data
+
+    def _parse(self, content):
+        if self.path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError(
+                    f'PyYAML is required to load {self.path}') from None
+            data = yaml.safe_load(content)
+        else:
+            data = json.loads(content.decode('utf-8'))
+        if not isinstance(data, dict):
+            raise ValueError(f'{self.path} must contain {{key: params}} '
+                             f'mapping')
+        return data
+
+    def __getitem__(self, key):
+        """Return params of key."""
+        return self._load()[key]
+
+    def __contains__(self, key):
+        """Check whether key is registered."""
+        return key in self._load()
+
+    def __iter__(self):
+        """Iterate over keys."""
+        return iter(self._load())
+
+    def __len__(self):
+        """Return number of keys."""
+        return len(self._load())
+
+    def __repr__(self):
+        """Represent registry without reading the file."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        return f'FileRegistry({self.path!r}, mtime={mtime})'
@@ -0,0 +1,108 @@
+"""Named scenarios, built once in savepoint layers and shared by tests."""
+
+from collections import namedtuple
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+__all__ = ('Scenario',)
+
+Layer = namedtuple('Layer', 'key atomic using instances')
+
+# Entered layers, outermost first
+_layers = []
+
+
+class Scenario:
+    """Objects of a named scenario on top of its base scenarios.
+
+    Every scenario is built in its own savepoint layer on top of the layer
+    of its base. Layers, which are already entered, are reused, so nested
+    scenarios only create their own objects. Leaving the scenario rolls
+    back layers it has entered.
+    """
+
+    def __init__(self, object_manager_class, name, using=DEFAULT_DB_ALIAS):
+        """Initialize scenario, nothing is created yet."""
+        self.object_manager_class = object_manager_class
+        self.name = name
+        self.using = using
+        self._entered = []
+
+    def chain(self):
+        """Return names of base scenarios, ending with this one."""
+        names = []
+        name = self.name
+        while name is not None:
+            if name in names:
+                raise ValueError('Scenario cycle: ' +
+                                 ' -> '.join(names + [name]))
+            names.append(name)
+            name = self.object_manager_class._scenarios[name][0]
+        return names[::-1]
+
+    def enter(self):
+        """Build missing layers, return object manager with their objects."""
+        keys = [(self.object_manager_class, name) for name in self.chain()]
+        depth = 0
+        while depth < min(len(_layers), len(keys)) and \
+                _layers[depth].key == keys[depth]:
+            depth += 1
+        if depth < len(_layers):
+            raise RuntimeError(f'Scenario {self.name} does not extend '
+                               f'entered scenario {_layers[-1].key[1]}')
+        opened = 0
+        try:
+            for key in keys[depth:]:
+                self._build(key)
+                opened += 1
+        except BaseException:
+            self._rollback(opened)
+            raise
+        self._entered.append(opened)
+        return self.seed(self.object_manager_class())
+
+    def leave(self):
+        """Roll back layers, which were built by the last `enter()`."""
+        self._rollback(self._entered.pop())
+
+    def seed(self, object_manager):
+        """Add objects of entered layers to object manager cache."""
+        if not _layers or \
+                _layers[-1].key != (self.object_manager_class, self.name):
+            raise RuntimeError(f'Scenario {self.name} is not entered')
+        object_manager._seed(_layers[-1].instances)
+        return object_manager
+
+    def _build(self, key):
+        object_manager_class, name = key
+        _, fixtures = object_manager_class._scenarios[name]
+        atomic = transaction.atomic(using=self.using)
+        atomic.__enter__()
+        try:
+            object_manager = object_manager_class()
+            if _layers:
+                Scenario(object_manager_class, _layers[-1].key[1],
+                         self.using).seed(object_manager)
+            object_manager.load_fixtures(fixtures)
+        except BaseException:
+            transaction.set_rollback(True, using=self.using)
+            atomic.__exit__(None, None, None)
+            raise
+        _layers.append(Layer(key=key, atomic=atomic, using=self.using,
+                             instances={
+                                 name: dict(cached.items()) for name, cached
+                                 in object_manager._instances.items()}))
+
+    def _rollback(self, count):
+        for _ in range(count):
+            layer = _layers.pop()
+            transaction.set_rollback(True, using=layer.using)
+            layer.atomic.__exit__(None, None, None)
+
+    def __enter__(self):
+        """Enter scenario, return object manager with its objects."""
+        return self.enter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Leave scenario."""
+        self.leave()
@@ -0,0 +1,91 @@
+"""Snapshots of created objects, which are restored without creation logic."""
+
+from itertools import groupby
+
+from django.db import transaction
+
+from .batch import bulk_insert
+
+__all__ = ('Snapshot',)
+
+
+class Snapshot:
+    """Rows inserted by object manager, restorable into any database.
+
+    Rows are stored in insertion order, primary keys are assigned by the
+    database on restore and relations between restored rows are remapped.
+    """
+
+    def __init__(self, inserted, instances):
+        """Record rows of inserted objects and ids of cached instances."""
+        self.runs = []
+        for model, group in groupby(inserted, type):
+            fields = [field for field in model._meta.concrete_fields
+                      if not field.primary_key]
+            rows = [(instance.pk,
+                     [getattr(instance, field.attname) for field in fields])
+                    for instance in group]
+            self.runs.append((model, fields, rows))
+        self.keys = {name: {key: instance.pk
+                            for key, instance in cached.items()}
+                     for name, cached in instances.items()}
+
+    @classmethod
+    def capture(cls, object_manager, fixtures):
+        """Create fixtures in a rolled back transaction, recording rows."""
+        with transaction.atomic():
+            object_manager.load_fixtures(fixtures)
+            snapshot = cls(object_manager._inserted,
+                           object_manager._instances)
+            transaction.set_rollback(True)
+        return snapshot
+
+    def restore(self, object_manager):
+        """Insert recorded rows, seeding object manager instance cache."""
+        restored = {}
+        for model, fields, rows in self.runs:
+            concrete_model = model._meta.concrete_model
+            self_references = [
+                index for index, field in enumerate(fields)
+                if field.is_relation and field.target_field.primary_key and
+                field.related_model._meta.concrete_model is concrete_model]
+            pending = []
+            pending_pks = set()
+            for pk, values in rows:
+                if any(values[index] in pending_pks
+                       for index in self_references):
+                    # Rows of the same model are inserted level by level,
+                    # so that self references are remapped
+                    self._insert(object_manager, model, fields, pending,
+                                 restored)
+                    pending = []
+                    pending_pks = set()
+                pending.append((pk, values))
+                pending_pks.add(pk)
+            self._insert(object_manager, model, fields, pending, restored)
+        for name, keys in self.keys.items():
+            model = object_manager._get_model(name)._meta.concrete_model
+            for key, pk in keys.items():
+                object_manager._instances[name][key] = restored[(model, pk)]
+
+    @staticmethod
+    def _insert(object_manager, model, fields, rows, restored):
+        """Insert rows of model, remapping relations to restored rows."""
+        instances = []
+        for _, values in rows:
+            params = {}
+            for field, value in zip(fields, values):
+                target = None
+                if field.is_relation and field.target_field.primary_key:
+                    target = restored.get(
+                        (field.related_model._meta.concrete_model, value))
+                if target is not None:
+                    params[field.name] = target
+                else:
+                    params[field.attname] = value
+            instances.append(model(**params))
+        bulk_insert(model, instances)
+        object_manager._record(instances)
+        for (pk, _), instance in zip(rows, instances):
+            if pk is not None:
+                restored[(model._meta.concrete_model, pk)] = instance
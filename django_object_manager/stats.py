@@ -0,0 +1,237 @@
+"""Fixture cost instrumentation - created objects, queries and time."""
+
+from collections import defaultdict
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.db import connections
+from django.dispatch import Signal
+
+__all__ = ('FixtureStats', 'fixture_created')
+
+# Sent after registered or custom object is inserted, when stats are
+# collected, with `name`, `key`, `queries` and `seconds` arguments. Cost
+# excludes creation of dependencies.
+fixture_created = Signal()
+
+
+class Record:
+    """Accumulated cost of a fixture, converter, post action or call."""
+
+    __slots__ = ('count', 'queries', 'seconds')
+
+    def __init__(self):
+        """Initialize empty record."""
+        self.count = 0
+        self.queries = 0
+        self.seconds = 0.0
+
+    def add(self, queries, seconds, count=1):
+        """Account single measurement."""
+        self.count += count
+        self.queries += queries
+        self.seconds += seconds
+
+    def __repr__(self):
+        """Represent record."""
+        return (f'<Record: count={self.count} queries={self.queries} '
+                f'seconds={self.seconds:.6f}>')
+
+
+class Cost:
+    """Cost of a single created object, reported by `fixture_created`."""
+
+    __slots__ = ('model', 'name', 'key', 'queries', 'seconds')
+
+    def __init__(self, model, name, key, queries, seconds):
+        """Initialize cost."""
+        self.model = model
+        self.name = name
+        self.key = key
+        self.queries = queries
+        self.seconds = seconds
+
+    def send(self):
+        """Send `fixture_created` signal."""
+        fixture_created.send(sender=self.model, name=self.name, key=self.key,
+                             queries=self.queries, seconds=self.seconds)
+
+
+class _Frame:
+
+    __slots__ = ('records', 'key', 'inclusive', 'shared', 'started',
+                 'queries', 'nested_seconds', 'nested_queries')
+
+    def __init__(self, records, key, inclusive, queries, shared=None):
+        self.records = records
+        self.key = key
+        self.inclusive = inclusive
+        self.shared = shared
+        self.queries = queries
+        self.nested_seconds = 0.0
+        self.nested_queries = 0
+        self.started = perf_counter()
+
+
+class _NoStats:
+    """Measurement context, used when stats are not collected."""
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+no_stats = _NoStats()
+
+
+class FixtureStats:
+    """Cost of object creation, collected by `ObjectManager`.
+
+    Costs of objects (`fixtures`, keyed by `(name, key)`), converters and
+    post actions (`converters` and `post_actions`, keyed by
+    `(name, field_name)`) exclude creation of their dependencies, costs of
+    accessor calls (`calls`, keyed by `ObjectManager.Context`) include
+    everything.
+    Key is `None` for custom objects. Fixtures, which were selected by
+    `load_fixtures` or `get_<plural>` accessors, are `requested`, fixtures
+    returned by `get_<name>` accessors or referenced by other objects are
+    `used`.
+    """
+
+    def __init__(self):
+        """Initialize empty stats."""
+        self.fixtures = defaultdict(Record)
+        self.converters = defaultdict(Record)
+        self.post_actions = defaultdict(Record)
+        self.calls = defaultdict(Record)
+        self.requested = {}
+        self.used = set()
+        self.query_count = 0
+        self._stack = []
+        self._wrappers = None
+
+    def measure(self, kind, key, model=None):
+        """Return context, which measures cost of `kind` (records name)."""
+        return _Measurement(self, kind, key, model)
+
+    def measure_shared(self, costs):
+        """Return context, which splits its cost evenly between fixtures.
+
+        Used for deferred inserts and post actions of batched objects, cost
+        is added to fixture records (without changing their count) and to
+        `costs` of created objects.
+        """
+        return _SharedMeasurement(self, costs)
+
+    def request(self, name, keys):
+        """Record fixtures, selected for creation."""
+        self.requested.update(dict.fromkeys((name, key) for key in keys))
+
+    def use(self, name, key):
+        """Record fixture usage."""
+        self.used.add((name, key))
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.query_count += 1
+        return execute(sql, params, many, context)
+
+    def _enter(self, kind, key, shared=None):
+        if not self._stack:
+            self._wrappers = ExitStack()
+            for connection in connections.all():
+                self._wrappers.enter_context(
+                    connection.execute_wrapper(self._count_query))
+        frame = _Frame(getattr(self, kind), key, kind == 'calls',
+                       self.query_count, shared)
+        self._stack.append(frame)
+        return frame
+
+    def _exit(self, frame):
+        self._stack.pop()
+        seconds = perf_counter() - frame.started
+        queries = self.query_count - frame.queries
+        own_queries, own_seconds = queries, seconds
+        if not frame.inclusive:
+            own_queries -= frame.nested_queries
+            own_seconds -= frame.nested_seconds
+        if frame.shared is not None:
+            self._share(frame.shared, own_queries, own_seconds)
+        else:
+            frame.records[frame.key].add(own_queries, own_seconds)
+        if frame.records is self.fixtures:
+            # Nested frames up to the enclosing fixture exclude this one
+            for outer in reversed(self._stack):
+                outer.nested_seconds += seconds
+                outer.nested_queries += queries
+                if outer.records is self.fixtures:
+                    break
+        if not self._stack:
+            self._wrappers.close()
+            self._wrappers = None
+        return own_queries, own_seconds
+
+    def _share(self, costs, queries, seconds):
+        for index, cost in enumerate(costs):
+            # Remaining queries go to the first fixtures
+            share = queries // len(costs) + (index < queries % len(costs))
+            cost.queries += share
+            cost.seconds += seconds / len(costs)
+            self.fixtures[cost.name, cost.key].add(
+                share, seconds / len(costs), count=0)
+
+    def unused(self):
+        """Return requested `(name, key)` pairs, which were not used."""
+        return [item for item in self.requested if item not in self.used]
+
+    def report(self, limit=10):
+        """Return text report of the most expensive and unused fixtures."""
+        lines = ['Most expensive fixtures (queries, seconds, created):']
+        expensive = sorted(self.fixtures.items(),
+                           key=lambda item: (item[1].seconds,
+                                             item[1].queries),
+                           reverse=True)[:limit]
+        for (name, key), record in expensive:
+            key = '<custom>' if key is None else repr(key)
+            lines.append(f'  {name} {key}: {record.queries} '
+                         f'{record.seconds:.4f} {record.count}')
+        unused = self.unused()
+        lines.append(f'Requested fixtures, which were never used: '
+                     f'{len(unused)}')
+        lines.extend(f'  {name} {key!r}' for name, key in unused)
+        return '\n'.join(lines)
+
+
+class _Measurement:
+
+    __slots__ = ('stats', 'kind', 'key', 'model', 'frame', 'cost')
+
+    def __init__(self, stats, kind, key, model):
+        self.stats = stats
+        self.kind = kind
+        self.key = key
+        self.model = model
+
+    def __enter__(self):
+        self.frame = self.stats._enter(self.kind, self.key)
+
+    def __exit__(self, *exc_info):
+        queries, seconds = self.stats._exit(self.frame)
+        if self.kind == 'fixtures':
+            self.cost = Cost(self.model, *self.key, queries, seconds)
+
+
+class _SharedMeasurement:
+
+    __slots__ = ('stats', 'costs', 'frame')
+
+    def __init__(self, stats, costs):
+        self.stats = stats
+        self.costs = costs
+
+    def __enter__(self):
+        self.frame = self.stats._enter('fixtures', None, self.costs)
+
+    def __exit__(self, *exc_info):
+        self.stats._exit(self.frame)
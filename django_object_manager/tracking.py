@@ -0,0 +1,45 @@
+"""Saved state tracking, which skips writes of unchanged objects."""
+
+__all__ = ('changed_fields', 'mark_saved', 'save_changed')
+
+SAVED_STATE = '_object_manager_saved'
+
+
+def _field_values(instance):
+    return {field.attname: getattr(instance, field.attname)
+            for field in instance._meta.concrete_fields
+            if not field.primary_key}
+
+
+def mark_saved(instances):
+    """Remember field values of instances, which match database rows."""
+    for instance in instances:
+        # Kept in instance dict, so that copies of instances share it
+        instance.__dict__[SAVED_STATE] = _field_values(instance)
+
+
+def changed_fields(instance):
+    """Return names of fields changed since save or `None` if not tracked."""
+    saved = instance.__dict__.get(SAVED_STATE)
+    if saved is None:
+        return None
+    return [field.name for field in instance._meta.concrete_fields
+            if not field.primary_key and
+            getattr(instance, field.attname) != saved[field.attname]]
+
+
+def save_changed(instance):
+    """Save instance, writing only fields changed since the last save.
+
+    Returns whether query was issued. Untracked saved instances are
+    saved entirely.
+    """
+    if instance._state.adding or instance.pk is None:
+        instance.save()
+    else:
+        changed = changed_fields(instance)
+        if changed is not None and not changed:
+            return False
+        instance.save(update_fields=changed)
+    mark_saved([instance])
+    return True
@@ -29,7 +29,7 @@ setup(
     install_requires=['django'],
     setup_requires=['pytest-runner'],
     tests_require=['pytest', 'pytest-cov', 'pytest-django'],
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks', 'benchmarks.*']),
     project_urls={
         'Bug Reports': 'https://github.com/K0Te/django-object-manager/issues',
         'Source': 'https://github.com/K0Te/django-object-manager',
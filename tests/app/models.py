@@ -40,3 +40,18 @@ class Film(models.Model):
                                         related_name='films',
                                         # through=FilmToFilmCategory
                                         )
+
+
+class Playlist(models.Model):
+    id = models.AutoField('Identifier', primary_key=True)
+    name = models.CharField('Name', max_length=70)
+    films = models.ManyToManyField(Film,
+                                   related_name='playlists',
+                                   through='PlaylistEntry')
+
+
+class PlaylistEntry(models.Model):
+    id = models.AutoField('Identifier', primary_key=True)
+    playlist = models.ForeignKey(Playlist, on_delete=models.CASCADE)
+    film = models.ForeignKey(Film, on_delete=models.CASCADE)
+    added = models.DateTimeField('Added', auto_now_add=True)
@@ -1,7 +1,7 @@
 """Tests helpers for application."""
 
 from django_object_manager.object_manager import ObjectManager
-from .models import User, Film, FilmCategory, UserExtraInfo
+from .models import User, Film, FilmCategory, UserExtraInfo, Playlist
 
 ObjectManager.register(
     User,
@@ -53,3 +53,11 @@ ObjectManager.register(
             'address': 'NY'
         }
     })
+ObjectManager.register(
+    Playlist,
+    {
+        'favourites': {
+            'name': 'Favourites',
+            'films': ['memento', 'godfather'],
+        },
+    })
@@ -1,14 +1,61 @@
+import json
 import os
+import subprocess
+import sys
+import tempfile
+from copy import copy
+from importlib.util import find_spec
+from unittest import mock, skipUnless
+
 import django
-from django.test import TestCase
+from django.apps import apps
+from django.db import IntegrityError, connection, transaction
+from django.db.models import (
+    CASCADE,
+    CharField,
+    EmailField,
+    ForeignKey,
+    IntegerField,
+    Model,
+)
+from django.db.models.signals import post_migrate, post_save
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 
-from django_object_manager import ObjManagerMixin
+from django_object_manager import (
+    ObjManagerMixin,
+    ObjManagerTestDataMixin,
+    ObjectManager,
+)
+from django_object_manager.field_converters import FieldConverterResult
+from django_object_manager.stats import FixtureStats, fixture_created
 
 os.environ['DJANGO_SETTINGS_MODULE'] = 'tests.settings'  # noqa
 django.setup()  # noqa
 
 from tests.app import models, tests
 
+# Model of another app, named like tests.app.models.User
+OtherUser = type('User', (Model,), {
+    '__module__': __name__,
+    'name': CharField(max_length=70),
+    'Meta': type('Meta', (), {'app_label': 'other'})})
+# Model of another app, referencing OtherUser
+OtherDoc = type('Doc', (Model,), {
+    '__module__': __name__,
+    'owner': ForeignKey(OtherUser, on_delete=CASCADE),
+    'Meta': type('Meta', (), {'app_label': 'other'})})
+
+
+def isolated_registry():
+    """Restore registrations and caches, which depend on them, on exit."""
+    return mock.patch.multiple(
+        ObjectManager,
+        _compiled=ObjectManager._compiled,
+        **{name: copy(getattr(ObjectManager, name))
+           for name in (ObjectManager._registry_attributes +
+                        ObjectManager._cache_attributes)})
+
 
 class TestPlaneMake(ObjManagerMixin, TestCase):
     """Ensure that Object Manager can create objects."""
@@ -18,7 +65,8 @@ class TestPlaneMake(ObjManagerMixin, TestCase):
         import django_object_manager as om
         names = list(sorted([name for name in dir(om)
                              if not name.startswith('__')]))
-        assert names == ['ObjManagerMixin', 'ObjectManager']
+        assert names == ['ObjManagerMixin', 'ObjManagerTestDataMixin',
+                         'ObjectManager']
 
     def test_multiple_predefined(self):
         """Ensure that multiple predefined objects can be created."""
@@ -140,3 +188,1146 @@ class TestPlaneMake(ObjManagerMixin, TestCase):
         extra_info = self.object_manager.get_userextrainfo('extra_info_1',
                                                            user='bob')
         assert extra_info.user.name == 'Bob'
+
+    def test_many_to_many_single_insert(self):
+        """Ensure that M2M relations are created with single insert."""
+        film = self.object_manager.get_film('memento')
+        categories = self.object_manager.get_filmcategories()
+        through = models.Film.categories.through
+        with CaptureQueriesContext(connection) as queries:
+            self.object_manager.get_film(name='Memento',
+                                         year=2000,
+                                         uploaded_by='bob',
+                                         categories=list(categories.values()))
+            self.object_manager.get_filmcategory(name='Thriller',
+                                                 films=[film])
+        inserts = [query for query in queries
+                   if query['sql'].startswith('INSERT') and
+                   through._meta.db_table in query['sql']]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(through.objects.count(), 5)
+
+    def test_many_to_many_custom_through(self):
+        """Ensure that M2M relations with custom through model are created."""
+        playlist = self.object_manager.get_playlist('favourites')
+        self.assertEqual(playlist.films.count(), 2)
+        self.assertEqual(models.PlaylistEntry.objects.count(), 2)
+        assert all(entry.added for entry in
+                   models.PlaylistEntry.objects.all())
+
+    def test_many_to_many_custom_through_reversed(self):
+        """Ensure that reverse M2M with custom through model is created."""
+        playlist = self.object_manager.get_playlist(name='Empty')
+        film = self.object_manager.get_film('memento', playlists=[playlist])
+        self.assertEqual(list(film.playlists.all()), [playlist])
+
+    def test_register_converter(self):
+        """Ensure that registered converter is used by cached plans."""
+        self.object_manager.get_film('memento')
+
+        def double(object_manager, field, value):
+            return FieldConverterResult(value * 2, [], True)
+
+        with isolated_registry():
+            ObjectManager.register_converter(IntegerField, double)
+            film = self.object_manager.get_film('godfather')
+        self.assertEqual(film.year, 1974 * 2)
+
+    def test_accessors(self):
+        """Ensure that accessors are listed and cached."""
+        names = dir(self.object_manager)
+        assert 'get_user' in names
+        assert 'get_users' in names
+        assert 'get_filmcategories' in names
+        self.assertTrue(self.object_manager.get_user is
+                        self.object_manager.get_user)
+        with self.assertRaises(RuntimeError):
+            self.object_manager.get_unknown()
+        with self.assertRaises(AttributeError):
+            self.object_manager.unknown
+
+    def test_plural_override(self):
+        """Ensure that irregular plural can be registered."""
+        with isolated_registry():
+            ObjectManager.register(models.UserExtraInfo,
+                                   {'home': {'address': 'Home'}},
+                                   plural='extras')
+            extras = ObjectManager().get_extras()
+        self.assertEqual(extras['home'].address, 'Home')
+
+
+class TestBatch(ObjManagerMixin, TestCase):
+    """Ensure that objects can be created in batches."""
+
+    def test_flush_on_exit(self):
+        """Ensure that batched objects are inserted on exit."""
+        with self.object_manager.batch():
+            film = self.object_manager.get_film('memento')
+            self.assertIsNone(film.pk)
+            self.assertEqual(models.Film.objects.count(), 0)
+        self.assertIsNotNone(film.pk)
+        self.assertEqual(film.uploaded_by_id, film.uploaded_by.pk)
+        self.assertEqual(models.User.objects.count(), 1)
+        self.assertTrue(self.object_manager.get_film('memento') is film)
+
+    def test_dependency_order(self):
+        """Ensure that dependencies of the same model are inserted first."""
+        categories = self.object_manager.get_filmcategories()
+        anime = models.FilmCategory.objects.get(pk=categories['anime'].pk)
+        self.assertEqual(anime.parent_category_id, categories['serious'].pk)
+        self.assertEqual(models.FilmCategory.objects.count(), 4)
+
+    def test_multiple_are_batched(self):
+        """Ensure that single insert is used per dependency level."""
+        with CaptureQueriesContext(connection) as queries:
+            self.object_manager.get_filmcategories()
+        inserts = [query for query in queries
+                   if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)
+
+    def test_post_actions(self):
+        """Ensure that M2M relations are created after flush."""
+        with self.object_manager.batch():
+            film = self.object_manager.get_film(
+                'memento', categories=['crime', 'drama'])
+        self.assertEqual(film.categories.count(), 2)
+
+    def test_links_are_batched(self):
+        """Ensure that M2M links are inserted once per through model."""
+        with CaptureQueriesContext(connection) as queries:
+            with self.object_manager.batch():
+                memento = self.object_manager.get_film(
+                    'memento', categories=['crime', 'drama'])
+                godfather = self.object_manager.get_film(
+                    'godfather', categories=['crime', 'crime'])
+        table = models.Film.categories.through._meta.db_table
+        inserts = [query for query in queries
+                   if query['sql'].startswith(f'INSERT INTO "{table}"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(memento.categories.count(), 2)
+        self.assertEqual(godfather.categories.count(), 1)
+
+    def test_save_receivers(self):
+        """Ensure that models with save receivers are saved one by one."""
+        saved = []
+
+        def receiver(instance, **kwargs):
+            saved.append(instance)
+
+        post_save.connect(receiver, sender=models.User)
+        self.addCleanup(post_save.disconnect, receiver, sender=models.User)
+        users = self.object_manager.get_users()
+        self.assertCountEqual(saved, users.values())
+
+    def test_error_discards_batch(self):
+        """Ensure that failed batch leaves no objects behind."""
+        with self.assertRaises(ZeroDivisionError):
+            with self.object_manager.batch():
+                bob = self.object_manager.get_user('bob')
+                1 / 0
+        self.assertEqual(models.User.objects.count(), 0)
+        self.assertTrue(self.object_manager.get_user('bob') is not bob)
+
+    def test_error_on_flush(self):
+        """Ensure that objects of failed flush are forgotten."""
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic(), self.object_manager.batch():
+                bob = self.object_manager.get_user('bob')
+                self.object_manager.get_user(name=None, email='x@y.com')
+        self.assertIsNone(bob.pk)
+        film = self.object_manager.get_film('memento')
+        self.assertIsNotNone(film.uploaded_by.pk)
+        self.assertTrue(film.uploaded_by is not bob)
+
+
+class TestSharedFixtures(ObjManagerTestDataMixin, TestCase):
+    """Ensure that shared objects are created once per class."""
+
+    object_manager_fixtures = {'film': ['memento'], 'user': '__all__'}
+
+    def test_no_queries(self):
+        """Ensure that shared objects are returned without queries."""
+        with self.assertNumQueries(0):
+            film = self.object_manager.get_film('memento')
+            bob = self.object_manager.get_user('bob')
+            self.object_manager.get_user('alice')
+        self.assertTrue(film.uploaded_by is bob)
+        self.assertEqual(models.User.objects.count(), 2)
+
+    def test_copied_per_test(self):
+        """Ensure that tests do not share objects in memory."""
+        bob = self.object_manager.get_user('bob')
+        shared = self.object_manager_instances['user']['bob']
+        self.assertTrue(bob is not shared)
+        self.assertEqual(bob.pk, shared.pk)
+
+    def test_load_fixtures(self):
+        """Ensure that other objects can be created."""
+        loaded = self.object_manager.load_fixtures({'film': '__all__'})
+        self.assertEqual(set(loaded['film']), {'memento', 'godfather'})
+        self.assertEqual(models.Film.objects.count(), 2)
+
+
+class TestSharedCompactFixtures(ObjManagerTestDataMixin, TestCase):
+    """Ensure that shared objects are created with manager options."""
+
+    object_manager_fixtures = {'user': '__all__'}
+    object_manager_options = {'compact': True}
+
+    def test_compact(self):
+        """Ensure that shared objects seed compact cache."""
+        with self.assertNumQueries(0):
+            users = self.object_manager.get_users()
+        self.assertEqual(set(users), {'bob', 'alice'})
+        self.assertEqual(models.User.objects.count(), 2)
+
+
+class TestSnapshot(ObjManagerMixin, TestCase):
+    """Ensure that objects can be restored from snapshot."""
+
+    fixtures_selection = {'playlist': '__all__', 'user': ['alice']}
+
+    def test_restore(self):
+        """Ensure that restored objects match created ones."""
+        self.object_manager.load_snapshot(self.fixtures_selection)
+        playlist = self.object_manager.get_playlist('favourites')
+        memento = self.object_manager.get_film('memento')
+        self.assertTrue(memento.uploaded_by is
+                        self.object_manager.get_user('bob'))
+        self.assertEqual(set(playlist.films.all()),
+                         {memento, self.object_manager.get_film('godfather')})
+        self.assertEqual(models.User.objects.count(), 2)
+        self.assertEqual(models.PlaylistEntry.objects.count(), 2)
+
+    def test_no_creation_logic(self):
+        """Ensure that objects are created only once."""
+        ObjectManager().load_snapshot(self.fixtures_selection)
+        with mock.patch.object(ObjectManager, '_get_or_create') as create:
+            loaded = self.object_manager.load_snapshot(
+                self.fixtures_selection)
+        create.assert_not_called()
+        self.assertEqual(set(loaded['user']), {'alice'})
+        self.assertEqual(models.User.objects.count(), 4)
+
+    def test_self_reference(self):
+        """Ensure that self references point to rows of the same restore."""
+        for _ in range(2):
+            categories = ObjectManager().load_snapshot(
+                {'filmcategory': '__all__'})['filmcategory']
+            self.assertEqual(categories['anime'].parent_category_id,
+                             categories['serious'].pk)
+        self.assertEqual(models.FilmCategory.objects.count(), 8)
+
+    def test_invalidated(self):
+        """Ensure that snapshot is recreated after registration change."""
+        self.object_manager.load_snapshot({'user': ['bob']})
+        with isolated_registry():
+            ObjectManager.register(models.User,
+                                   {'bob': {'name': 'Robert',
+                                            'email': 'bob@domain.com'}})
+            bob = ObjectManager().load_snapshot({'user': ['bob']})
+        self.assertEqual(bob['user']['bob'].name, 'Robert')
+
+
+class TestBuild(SimpleTestCase):
+    """Ensure that unsaved objects can be built without database."""
+
+    def setUp(self):
+        """Set test environment up."""
+        self.object_manager = ObjectManager()
+
+    def test_foreign_key(self):
+        """Ensure that FK dependencies are built."""
+        film = self.object_manager.build_film('memento')
+        self.assertTrue(film._state.adding)
+        self.assertEqual(film.uploaded_by.name, 'Bob')
+        self.assertIsNone(film.uploaded_by_id)
+        self.assertTrue(film is self.object_manager.build_film('memento'))
+
+    def test_many_to_many(self):
+        """Ensure that M2M values are available from related managers."""
+        film = self.object_manager.build_film('memento',
+                                              categories=['crime', 'drama'])
+        self.assertEqual([category.name for category in film.categories.all()],
+                         ['Crime', 'Drama'])
+        category = self.object_manager.build_filmcategory(
+            'serious', films=['memento', 'godfather'])
+        self.assertEqual(category.films.count(), 2)
+
+    def test_multiple(self):
+        """Ensure that multiple objects can be built."""
+        categories = self.object_manager.build_filmcategories()
+        self.assertTrue(categories['anime'].parent_category is
+                        categories['serious'])
+
+    def test_one2one(self):
+        """Ensure that one2one dependencies are built."""
+        extra_info = self.object_manager.build_userextrainfo('extra_info_1',
+                                                             user='bob')
+        self.assertEqual(extra_info.user.name, 'Bob')
+
+    def test_explicit_pk(self):
+        """Ensure that explicit primary key is kept."""
+        user = self.object_manager.build_user(name='X', email='x@y.com',
+                                              id=42)
+        self.assertEqual(user.pk, 42)
+
+    def test_unsaved(self):
+        """Ensure that built objects have no primary keys."""
+        film = self.object_manager.build_film('memento',
+                                              categories=['crime'])
+        self.assertIsNone(film.pk)
+        self.assertIsNone(film.uploaded_by.pk)
+        self.assertEqual(len(film.categories.all()), 1)
+        with self.assertRaises(ValueError):
+            models.Film(name='Insomnia', year=2002,
+                        uploaded_by=film.uploaded_by).save()
+
+
+class TestBuildSaved(ObjManagerMixin, TestCase):
+    """Ensure that built objects are independent of created ones."""
+
+    def test_one2one(self):
+        """Ensure that one2one dependency is built after creation."""
+        self.object_manager.get_user('bob')
+        extra_info = self.object_manager.build_userextrainfo('extra_info_1',
+                                                             user='bob')
+        self.assertIsNone(extra_info.user.pk)
+        self.assertEqual(extra_info.user.name, 'Bob')
+
+    def test_save(self):
+        """Ensure that saved built object does not overwrite other rows."""
+        alice = self.object_manager.get_user('alice')
+        self.object_manager.build_user('bob').save()
+        alice.refresh_from_db()
+        self.assertEqual(alice.name, 'Alice')
+        self.assertEqual(models.User.objects.count(), 2)
+
+
+class TestLazy(ObjManagerMixin, TestCase):
+    """Ensure that lazy handles create objects on demand."""
+
+    object_manager_options = {'lazy': True}
+
+    def test_plain_fields(self):
+        """Ensure that plain fields are read without queries."""
+        with self.assertNumQueries(0):
+            film = self.object_manager.get_film('memento')
+            self.assertEqual(film.name, 'Memento')
+        self.assertTrue(isinstance(film, models.Film))
+        self.assertTrue(film is self.object_manager.get_film('memento'))
+        self.assertEqual(models.Film.objects.count(), 0)
+
+    def test_primary_key(self):
+        """Ensure that primary key access creates object with dependencies."""
+        film = self.object_manager.get_film('memento',
+                                            categories=['crime', 'drama'])
+        self.assertIsNotNone(film.pk)
+        self.assertEqual(film.uploaded_by.name, 'Bob')
+        self.assertEqual(models.User.objects.count(), 1)
+        self.assertEqual(models.FilmCategory.objects.count(), 0)
+        self.assertEqual(film.categories.count(), 2)
+        self.assertEqual(models.FilmCategory.objects.count(), 2)
+
+    def test_related(self):
+        """Ensure that handles are created when referenced."""
+        bob = self.object_manager.get_user('bob')
+        film = self.object_manager.get_film(name='Memento',
+                                            year=2000,
+                                            uploaded_by=bob)
+        self.assertEqual(models.User.objects.count(), 0)
+        self.assertEqual(film.uploaded_by, bob)
+        self.assertEqual(models.User.objects.count(), 1)
+
+    def test_queryset(self):
+        """Ensure that handle can be used in queryset filters."""
+        bob = self.object_manager.get_user('bob')
+        self.assertFalse(models.Film.objects.filter(uploaded_by=bob).exists())
+        self.assertEqual(models.User.objects.count(), 1)
+
+    def test_multiple(self):
+        """Ensure that multiple handles are returned."""
+        users = self.object_manager.get_users()
+        self.assertEqual(users['alice'].email, 'alice@example.com')
+        self.assertEqual(models.User.objects.count(), 0)
+
+
+class TestCompile(ObjManagerMixin, TestCase):
+    """Ensure that registered references are validated."""
+
+    def test_unknown_reference(self):
+        """Ensure that misspelled reference is reported."""
+        with isolated_registry():
+            ObjectManager.register(models.Film, {
+                'memento': {'name': 'Memento',
+                            'year': 2000,
+                            'uploaded_by': 'bbo'}})
+            with self.assertRaisesRegex(ValueError, "unknown user 'bbo'"):
+                ObjectManager()
+
+    def test_cycle(self):
+        """Ensure that reference cycle is reported."""
+        with isolated_registry():
+            ObjectManager.register(models.FilmCategory, {
+                'first': {'name': 'First', 'parent_category': 'second'},
+                'second': {'name': 'Second', 'parent_category': 'first'}})
+            with self.assertRaisesRegex(ValueError, 'Reference cycle'):
+                ObjectManager.compile()
+
+    def test_plan(self):
+        """Ensure that plan lists inserts and queries."""
+        plan = self.object_manager.plan('playlist', 'favourites')
+        self.assertEqual(plan.inserts, [('user', 'bob'),
+                                        ('film', 'memento'),
+                                        ('film', 'godfather'),
+                                        ('playlist', 'favourites')])
+        with self.assertNumQueries(plan.queries):
+            self.object_manager.get_playlist('favourites')
+        self.assertEqual(self.object_manager.plan('film', 'memento'),
+                         ObjectManager.Plan(inserts=[], queries=0))
+
+    def test_plan_categories(self):
+        """Ensure that expected queries match M2M creation."""
+        self.object_manager.get_filmcategories()
+        with isolated_registry():
+            ObjectManager.register(models.Film, {
+                'memento': {'name': 'Memento',
+                            'year': 2000,
+                            'uploaded_by': 'bob',
+                            'categories': ['crime', 'anime']},
+                'godfather': {'name': 'The Godfather',
+                              'year': 1974,
+                              'uploaded_by': 'bob'}})
+            object_manager = ObjectManager()
+            object_manager._instances = self.object_manager._instances
+            plan = object_manager.plan('film', 'memento')
+            with self.assertNumQueries(plan.queries):
+                object_manager.get_film('memento')
+
+
+class TestStats(ObjManagerMixin, TestCase):
+    """Ensure that creation costs are collected."""
+
+    def setUp(self):
+        """Set test environment up."""
+        super().setUp()
+        self.stats = FixtureStats()
+        self.object_manager = ObjectManager(stats=self.stats)
+
+    def test_fixtures(self):
+        """Ensure that fixture costs exclude dependencies."""
+        self.object_manager.get_film('memento', categories=['crime'])
+        self.object_manager.get_film('memento')
+        self.assertEqual(self.stats.fixtures['user', 'bob'].queries, 1)
+        # Insert, M2M select and insert
+        self.assertEqual(self.stats.fixtures['film', 'memento'].queries, 3)
+        self.assertEqual(self.stats.fixtures['film', 'memento'].count, 1)
+        self.assertEqual(
+            self.stats.post_actions['film', 'categories'].queries, 2)
+        self.assertEqual(
+            self.stats.converters['film', 'uploaded_by'].queries, 0)
+        call = ObjectManager.Context(name='film', many=False, build=False)
+        self.assertEqual(self.stats.calls[call].count, 2)
+        self.assertEqual(self.stats.calls[call].queries, 5)
+
+    def test_signal(self):
+        """Ensure that signal is sent for created objects."""
+        created = []
+
+        def receiver(sender, name, key, queries, **kwargs):
+            created.append((sender, name, key, queries))
+
+        fixture_created.connect(receiver)
+        try:
+            self.object_manager.get_user('bob')
+        finally:
+            fixture_created.disconnect(receiver)
+        self.assertEqual(created, [(models.User, 'user', 'bob', 1)])
+
+    def test_batched(self):
+        """Ensure that batched inserts are attributed to fixtures."""
+        created = []
+
+        def receiver(sender, name, key, queries, **kwargs):
+            created.append((name, key, queries))
+
+        fixture_created.connect(receiver)
+        self.addCleanup(fixture_created.disconnect, receiver)
+        with self.assertNumQueries(4):
+            films = self.object_manager.get_films()
+        # Bulk insert and primary key selection are shared by films
+        self.assertEqual(created, [('user', 'bob', 2),
+                                   ('film', 'memento', 1),
+                                   ('film', 'godfather', 1)])
+        self.assertEqual(self.stats.fixtures['film', 'memento'].queries, 1)
+        self.assertEqual(self.stats.fixtures['film', 'memento'].count, 1)
+        self.assertIsNotNone(films['memento'].pk)
+
+    def test_report(self):
+        """Ensure that report lists expensive and unused fixtures."""
+        self.object_manager.get_users()
+        self.object_manager.get_film('memento')
+        report = self.stats.report()
+        self.assertIn("film 'memento'", report)
+        self.assertIn("  user 'alice'", report)
+        self.assertNotIn("  user 'bob'\n", report)
+        self.assertNotIn("  film 'godfather'", report)
+
+
+PLUGIN_TEST = """
+from django.test import TestCase
+
+from django_object_manager import ObjectManager
+
+
+class TestFilm(TestCase):
+
+    def test_film(self):
+        import tests.app.tests
+        ObjectManager().get_film('memento')
+"""
+
+
+class TestPytestPlugin(SimpleTestCase):
+    """Ensure that pytest plugin reports fixture costs."""
+
+    def run_pytest(self, *args):
+        """Run pytest with plugin in a separate process, return output."""
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'test_plugin.py'), 'w') as file:
+                file.write(PLUGIN_TEST)
+            process = subprocess.run(
+                [sys.executable, '-m', 'pytest', '-p', 'no:cacheprovider',
+                 '-p', 'django_object_manager.pytest_plugin', *args],
+                cwd=directory, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, universal_newlines=True,
+                env=dict(os.environ, PYTHONPATH=root,
+                         DJANGO_SETTINGS_MODULE='tests.settings'))
+        self.assertEqual(process.returncode, 0, process.stdout)
+        return process.stdout
+
+    def test_report(self):
+        """Ensure that report is written when enabled."""
+        output = self.run_pytest('--object-manager-report')
+        self.assertIn('object manager fixtures', output)
+        self.assertIn("film 'memento'", output)
+
+    def test_disabled(self):
+        """Ensure that report is not written by default."""
+        output = self.run_pytest()
+        self.assertNotIn('object manager fixtures', output)
+
+
+class TestSequence(ObjManagerMixin, TestCase):
+    """Ensure that generated objects are streamed."""
+
+    def setUp(self):
+        """Register sequence."""
+        registry = isolated_registry()
+        registry.start()
+        self.addCleanup(registry.stop)
+        ObjectManager.register_sequence(
+            models.UserExtraInfo,
+            'info_{n}',
+            lambda number: {'address': f'Street {number}'},
+            count=50,
+            chunk_size=20)
+        super().setUp()
+
+    def test_stream(self):
+        """Ensure that objects are inserted in chunks."""
+        with CaptureQueriesContext(connection) as queries:
+            pks = self.object_manager.get_userextrainfos()
+        inserts = [query for query in queries
+                   if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(len(pks), 50)
+        self.assertEqual(models.UserExtraInfo.objects.count(), 50)
+        self.assertFalse(self.object_manager._instances['userextrainfo'])
+        self.assertEqual(self.object_manager.get_userextrainfos(), pks)
+        self.assertEqual(models.UserExtraInfo.objects.get(pk=pks[7]).address,
+                         'Street 7')
+
+    def test_single(self):
+        """Ensure that single object is created or loaded by key."""
+        info = self.object_manager.get_userextrainfo('info_3')
+        self.assertEqual(info.address, 'Street 3')
+        pks = self.object_manager.get_userextrainfos()
+        self.assertEqual(pks[3], info.pk)
+        self.assertEqual(self.object_manager.get_userextrainfo('info_8').pk,
+                         pks[8])
+        self.assertEqual(models.UserExtraInfo.objects.count(), 50)
+
+    def test_reference(self):
+        """Ensure that sequence objects can be referenced."""
+        bob = self.object_manager.get_user('bob', extra_info='info_42')
+        self.assertEqual(bob.extra_info.address, 'Street 42')
+
+
+class TestFileRegistry(ObjManagerMixin, TestCase):
+    """Ensure that registrations are loaded from files."""
+
+    def setUp(self):
+        """Write fixture files to temporary directory."""
+        registry = isolated_registry()
+        registry.start()
+        self.addCleanup(registry.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'infos.json')
+        with open(self.path, 'w') as source:
+            json.dump({'home': {'address': 'Home street'}}, source)
+        super().setUp()
+
+    def test_lazy_load(self):
+        """Ensure that file is parsed on first use and cached."""
+        with mock.patch('json.loads') as loads:
+            ObjectManager.register_file(models.UserExtraInfo, self.path)
+            ObjectManager.compile()
+        loads.assert_not_called()
+        info = self.object_manager.get_userextrainfo('home')
+        self.assertEqual(info.address, 'Home street')
+        cache_path = os.path.join(os.path.dirname(self.path),
+                                  '.infos.json.cache')
+        self.assertTrue(os.path.exists(cache_path))
+        with mock.patch('json.loads') as loads:
+            ObjectManager.register_file(models.UserExtraInfo, self.path)
+            self.assertEqual(ObjectManager._data['userextrainfo']['home'],
+                             {'address': 'Home street'})
+        loads.assert_not_called()
+
+    def test_referenced_lazily(self):
+        """Ensure that references into file are not validated eagerly."""
+        path = os.path.join(os.path.dirname(self.path), 'users.json')
+        with open(path, 'w') as source:
+            json.dump({'bob': {'name': 'Bob', 'email': 'bob@domain.com'}},
+                      source)
+        with mock.patch('json.loads', wraps=json.loads) as loads:
+            ObjectManager.register_file(models.User, path)
+            object_manager = ObjectManager()
+            loads.assert_not_called()
+            film = object_manager.get_film('memento')
+        self.assertEqual(film.uploaded_by.name, 'Bob')
+        loads.assert_called_once()
+
+    def test_changed_file(self):
+        """Ensure that changed file is parsed again."""
+        ObjectManager.register_file(models.UserExtraInfo, self.path)
+        self.assertIn('home', ObjectManager._data['userextrainfo'])
+        with open(self.path, 'w') as source:
+            json.dump({'work': {'address': 'Work street 1'}}, source)
+        ObjectManager.register_file(models.UserExtraInfo, self.path)
+        self.assertEqual(list(ObjectManager._data['userextrainfo']), ['work'])
+
+    @skipUnless(find_spec('yaml'), 'PyYAML is not installed')
+    def test_yaml(self):
+        """Ensure that YAML files are supported."""
+        path = os.path.join(os.path.dirname(self.path), 'users.yaml')
+        with open(path, 'w') as source:
+            source.write('carol:\n  name: Carol\n  extra_info: home\n')
+        ObjectManager.register_file(models.UserExtraInfo, self.path)
+        ObjectManager.register_file(models.User, path)
+        carol = self.object_manager.get_user('carol')
+        self.assertEqual(carol.extra_info.address, 'Home street')
+
+
+class TestAsync(ObjManagerMixin, TestCase):
+    """Ensure that objects are created by async accessors."""
+
+    def setUp(self):
+        """Set test environment up, async accessors require asgiref."""
+        try:
+            from asgiref.sync import async_to_sync
+        except ImportError:
+            self.skipTest('asgiref is not installed')
+        self.async_to_sync = async_to_sync
+        super().setUp()
+
+    def test_single(self):
+        """Ensure that object is created with its dependencies."""
+        film = self.async_to_sync(self.object_manager.aget_film)(
+            'memento', categories=['crime', 'anime'])
+        self.assertEqual(film.uploaded_by.name, 'Bob')
+        self.assertEqual(sorted(film.categories.values_list('name',
+                                                            flat=True)),
+                         ['Anime', 'Crime'])
+        self.assertIs(self.object_manager.get_film('memento'), film)
+        self.assertIn('aget_films', dir(self.object_manager))
+
+    def test_multiple(self):
+        """Ensure that shared dependencies are created once."""
+        playlists = self.async_to_sync(self.object_manager.aget_playlists)()
+        films = playlists['favourites'].films.all()
+        self.assertEqual(sorted(film.name for film in films),
+                         ['Memento', 'The Godfather'])
+        self.assertEqual(models.User.objects.count(), 1)
+
+    def test_async_converter(self):
+        """Ensure that async converters are awaited."""
+        async def double(object_manager, field, value):
+            return FieldConverterResult(value * 2, [], True)
+
+        with isolated_registry():
+            ObjectManager.register_converter(IntegerField, double)
+            film = self.async_to_sync(self.object_manager.aget_film)(
+                'godfather')
+            self.assertEqual(film.year, 1974 * 2)
+            film = self.object_manager.get_film('memento')
+        self.assertEqual(film.year, 2000 * 2)
+
+
+class TestMemoize(ObjManagerMixin, TestCase):
+    """Ensure that custom objects are memoized on demand."""
+
+    object_manager_options = {'memoize': True}
+
+    def test_custom(self):
+        """Ensure that identical custom objects are created once."""
+        user = self.object_manager.get_user('bob', email='x@y.com')
+        self.assertIs(self.object_manager.get_user('bob', email='x@y.com'),
+                      user)
+        self.assertIsNot(self.object_manager.get_user('bob', email='z@y.com'),
+                         user)
+        self.assertIsNot(self.object_manager.get_user('bob'), user)
+        self.assertEqual(models.User.objects.count(), 3)
+
+    def test_normalized_references(self):
+        """Ensure that references and their objects are equal params."""
+        bob = self.object_manager.get_user('bob')
+        film = self.object_manager.get_film(name='Heat', year=1995,
+                                            uploaded_by='bob')
+        self.assertIs(self.object_manager.get_film(name='Heat', year=1995,
+                                                   uploaded_by=bob),
+                      film)
+        self.assertEqual(models.Film.objects.count(), 1)
+
+    def test_default(self):
+        """Ensure that custom objects are not memoized by default."""
+        object_manager = ObjectManager()
+        user = object_manager.get_user('bob', email='x@y.com')
+        self.assertIsNot(object_manager.get_user('bob', email='x@y.com'),
+                         user)
+
+
+class TestReuse(ObjManagerMixin, TestCase):
+    """Ensure that existing rows are reused by lookup fields."""
+
+    object_manager_options = {'reuse': True}
+
+    def setUp(self):
+        """Register lookup fields and create existing rows."""
+        registry = isolated_registry()
+        registry.start()
+        self.addCleanup(registry.stop)
+        ObjectManager.register(models.User, ObjectManager._data['user'],
+                               lookup=('email',))
+        self.bob = models.User.objects.create(name='Robert',
+                                              email='bob@domain.com')
+        super().setUp()
+
+    def test_single(self):
+        """Ensure that existing row is returned and referenced."""
+        self.assertEqual(self.object_manager.get_user('bob'), self.bob)
+        film = self.object_manager.get_film('memento')
+        self.assertEqual(film.uploaded_by, self.bob)
+        self.assertEqual(models.User.objects.count(), 1)
+
+    def test_multiple(self):
+        """Ensure that existing rows are found with one query."""
+        with CaptureQueriesContext(connection) as queries:
+            users = self.object_manager.get_users()
+        lookups = [query for query in queries
+                   if '"email" IN' in query['sql']]
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(users['bob'], self.bob)
+        self.assertEqual(users['alice'].name, 'Alice')
+        self.assertEqual(models.User.objects.count(), 2)
+
+    def test_disabled(self):
+        """Ensure that rows are inserted by default."""
+        bob = ObjectManager().get_user('bob')
+        self.assertNotEqual(bob, self.bob)
+
+
+class TestDirtyTracking(ObjManagerMixin, TestCase):
+    """Ensure that post actions write only changed objects."""
+
+    def test_unchanged_related(self):
+        """Ensure that cached related objects are not saved again."""
+        crime = self.object_manager.get_filmcategory('crime')
+        with CaptureQueriesContext(connection) as queries:
+            self.object_manager.get_film('memento', categories=['crime'])
+            self.object_manager.get_film('godfather', categories=[crime])
+        updates = [query for query in queries
+                   if query['sql'].startswith('UPDATE')]
+        self.assertEqual(updates, [])
+
+    def test_changed_fields(self):
+        """Ensure that only changed fields of related objects are saved."""
+        crime = self.object_manager.get_filmcategory('crime')
+        crime.name = 'Noir'
+        with CaptureQueriesContext(connection) as queries:
+            self.object_manager.get_film('memento', categories=[crime])
+        updates = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"name"', updates[0])
+        self.assertNotIn('"parent_category_id"', updates[0])
+        self.assertEqual(models.FilmCategory.objects.get(pk=crime.pk).name,
+                         'Noir')
+
+    def test_batch(self):
+        """Ensure that objects inserted in batch are tracked."""
+        with self.object_manager.batch():
+            self.object_manager.get_filmcategory('crime')
+        with CaptureQueriesContext(connection) as queries:
+            self.object_manager.get_film('memento', categories=['crime'])
+        self.assertFalse(any(query['sql'].startswith('UPDATE')
+                             for query in queries))
+
+
+class TestCleanup(ObjManagerMixin, TestCase):
+    """Ensure that inserted rows are deleted on cleanup."""
+
+    def test_cleanup(self):
+        """Ensure that objects, relations and dependents are deleted."""
+        existing = models.User.objects.create(name='Existing')
+        self.object_manager.get_playlist('favourites')
+        self.object_manager.get_film('memento', categories=['crime', 'anime'])
+        self.object_manager.get_userextrainfo('extra_info_1', user='alice')
+        with self.object_manager.batch():
+            self.object_manager.get_filmcategory('drama')
+        self.object_manager.cleanup()
+        self.assertEqual(list(models.User.objects.all()), [existing])
+        for model in (models.Film, models.FilmCategory, models.Playlist,
+                      models.PlaylistEntry, models.UserExtraInfo,
+                      models.Film.categories.through):
+            self.assertFalse(model.objects.exists(), model)
+        self.assertEqual(self.object_manager.get_user('bob').name, 'Bob')
+
+    def test_sequence(self):
+        """Ensure that streamed rows are deleted."""
+        with isolated_registry():
+            ObjectManager.register_sequence(
+                models.UserExtraInfo, 'info_{n}',
+                lambda number: {'address': f'Street {number}'}, count=30)
+            object_manager = ObjectManager()
+            object_manager.get_userextrainfos()
+            object_manager.get_user('bob', extra_info='info_3')
+            object_manager.cleanup()
+        self.assertFalse(models.UserExtraInfo.objects.exists())
+        self.assertFalse(models.User.objects.exists())
+
+    def test_tear_down(self):
+        """Ensure that mixin cleans up when enabled."""
+        with mock.patch.object(ObjectManager, 'cleanup') as cleanup:
+            self.tearDown()
+            cleanup.assert_not_called()
+            self.object_manager_cleanup = True
+            self.tearDown()
+        cleanup.assert_called_once_with()
+
+
+class TestRegistryIsolation(ObjManagerMixin, TestCase):
+    """Ensure that registries are isolated, frozen and prewarmed."""
+
+    def test_subclass(self):
+        """Ensure that subclass registrations do not leak."""
+        class Isolated(ObjectManager):
+            pass
+
+        Isolated.register(models.UserExtraInfo, {'home': {'address': 'H'}},
+                          plural='extras')
+        Isolated.register_converter(
+            IntegerField,
+            lambda object_manager, field, value:
+                FieldConverterResult(value, [], True))
+        self.assertIn('get_extras', Isolated._accessors)
+        self.assertNotIn('get_extras', ObjectManager._accessors)
+        self.assertNotIn(IntegerField, ObjectManager._converters)
+        self.assertEqual(Isolated().get_user('bob').name, 'Bob')
+
+    def test_parent_registered_later(self):
+        """Ensure that later parent registrations are visible."""
+        with isolated_registry():
+            class Child(ObjectManager):
+                pass
+
+            Child.register(models.UserExtraInfo, {'home': {'address': 'H'}},
+                           plural='extras', lookup=['address'])
+            Child().get_extras()
+            ObjectManager.register(models.User, dict(
+                ObjectManager._data['user'],
+                carol={'name': 'Carol', 'email': 'carol@example.com'}))
+            self.assertEqual(Child().get_user('carol').name, 'Carol')
+            self.assertNotIn('get_extras', ObjectManager._accessors)
+            self.assertIsNone(ObjectManager._lookups.get('userextrainfo'))
+            self.assertEqual(Child._lookups['userextrainfo'], ('address',))
+
+    def test_freeze(self):
+        """Ensure that frozen registry rejects registrations."""
+        class Frozen(ObjectManager):
+            pass
+
+        Frozen.freeze()
+        with self.assertRaises(RuntimeError):
+            Frozen.register(models.UserExtraInfo, {})
+        with self.assertRaises(RuntimeError):
+            Frozen.register_converter(IntegerField, None)
+        self.assertEqual(Frozen().get_film('memento').uploaded_by.name, 'Bob')
+
+    def test_prewarm(self):
+        """Ensure that prewarmed objects are loaded instead of inserted."""
+        class Prewarmed(ObjectManager):
+            pass
+
+        Prewarmed.prewarm({'film': ['memento']})
+        film = Prewarmed().get_film('memento')
+        with CaptureQueriesContext(connection) as queries:
+            bob = Prewarmed().get_user('bob')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(film.uploaded_by, bob)
+        self.assertEqual(models.User.objects.count(), 1)
+        models.Film.objects.all().delete()
+        self.assertIsNot(Prewarmed().get_film('memento').pk, None)
+
+    def test_prewarm_on_migrate(self):
+        """Ensure that database is prewarmed once after migrations."""
+        app_config = apps.get_app_config('test-app')
+        with mock.patch.object(ObjectManager, 'prewarm') as prewarm:
+            receiver = ObjectManager.prewarm_on_migrate({'user': ['bob']})
+            try:
+                for _ in range(2):
+                    post_migrate.send(sender=app_config,
+                                      app_config=app_config,
+                                      verbosity=0,
+                                      interactive=False,
+                                      using='default')
+            finally:
+                post_migrate.disconnect(receiver)
+        prewarm.assert_called_once_with({'user': ['bob']})
+
+
+class TestCompact(ObjManagerMixin, TestCase):
+    """Ensure that compact cache keeps primary keys and hot instances."""
+
+    object_manager_options = {'compact': True, 'cache_size': 2}
+
+    def test_evicted(self):
+        """Ensure that evicted instances are loaded by primary key."""
+        bob = self.object_manager.get_user('bob')
+        film = self.object_manager.get_film('memento')
+        self.object_manager.get_filmcategories()
+        self.assertEqual(len(self.object_manager._instances.hot), 2)
+        with CaptureQueriesContext(connection) as queries:
+            loaded = self.object_manager.get_user('bob')
+        self.assertEqual(len(queries), 1)
+        self.assertIsNot(loaded, bob)
+        self.assertEqual(loaded, bob)
+        with self.assertNumQueries(0):
+            self.assertIs(self.object_manager.get_user('bob'), loaded)
+        self.assertEqual(self.object_manager.get_film('memento'), film)
+        self.assertEqual(models.User.objects.count(), 1)
+
+    def test_many(self):
+        """Ensure that several instances are loaded with one query."""
+        categories = self.object_manager.get_filmcategories()
+        self.object_manager.get_users()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.object_manager.get_filmcategories(),
+                             categories)
+
+    def test_cleanup(self):
+        """Ensure that rows are deleted by recorded primary keys."""
+        self.object_manager.get_film('memento', categories=['crime'])
+        self.object_manager.cleanup()
+        self.assertFalse(models.Film.objects.exists())
+        self.assertFalse(models.User.objects.exists())
+        self.assertFalse(models.Film.categories.through.objects.exists())
+
+
+class TestRawBackend(ObjManagerMixin, TestCase):
+    """Ensure that objects are inserted without model instances."""
+
+    def setUp(self):
+        """Restore registrations on exit."""
+        registry = isolated_registry()
+        registry.start()
+        self.addCleanup(registry.stop)
+        super().setUp()
+
+    def test_insert(self):
+        """Ensure that rows are inserted and loaded on demand."""
+        pks = self.object_manager.insert({'film': '__all__'}, backend='raw')
+        memento = self.object_manager.get_film('memento')
+        self.assertEqual(memento.pk, pks['film']['memento'])
+        self.assertEqual(memento.uploaded_by,
+                         self.object_manager.get_user('bob'))
+        self.assertEqual(models.Film.objects.count(), 2)
+        self.assertEqual(self.object_manager.insert({'film': ['memento']}),
+                         {'film': {'memento': memento.pk}})
+
+    def test_registered(self):
+        """Ensure that registered backend inserts M2M links."""
+        ObjectManager.register(models.Playlist,
+                               ObjectManager._data['playlist'],
+                               backend='raw')
+        pks = self.object_manager.get_playlists()
+        playlist = models.Playlist.objects.get(pk=pks['favourites'])
+        self.assertEqual(sorted(film.name for film in playlist.films.all()),
+                         ['Memento', 'The Godfather'])
+        assert all(entry.added for entry in
+                   models.PlaylistEntry.objects.all())
+        self.object_manager.cleanup()
+        self.assertFalse(models.PlaylistEntry.objects.exists())
+        self.assertFalse(models.Playlist.objects.exists())
+
+    def test_sequence(self):
+        """Ensure that sequence chunks are inserted with executemany."""
+        ObjectManager.register_sequence(
+            models.UserExtraInfo, 'info_{n}',
+            lambda number: {'address': f'Street {number}'},
+            count=50, chunk_size=20, backend='raw')
+        # Insert and primary keys select per chunk
+        with self.assertNumQueries(6):
+            pks = self.object_manager.get_userextrainfos()
+        self.assertEqual(models.UserExtraInfo.objects.get(pk=pks[7]).address,
+                         'Street 7')
+
+    def test_unsupported(self):
+        """Ensure that reverse relations are rejected."""
+        ObjectManager.register(models.FilmCategory, {
+            'thriller': {'name': 'Thriller', 'films': ['memento']}})
+        with self.assertRaises(ValueError):
+            self.object_manager.insert({'filmcategory': ['thriller']},
+                                       backend='raw')
+        with self.assertRaises(ValueError):
+            ObjectManager.register(models.User, {}, backend='unknown')
+
+
+class TestModelRegistry(SimpleTestCase):
+    """Ensure that models are resolved by type."""
+
+    def setUp(self):
+        """Restore registrations on exit."""
+        registry = isolated_registry()
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def test_same_name(self):
+        """Ensure that models of different apps with same name coexist."""
+        ObjectManager.register(OtherUser, {'carol': {'name': 'Carol'}})
+        object_manager = ObjectManager()
+        self.assertEqual(ObjectManager._name_of(OtherUser), 'other_user')
+        self.assertIsInstance(object_manager.build_other_user('carol'),
+                              OtherUser)
+        self.assertEqual(list(object_manager.build_other_users()),
+                         ['carol'])
+        bob = object_manager.build_test_app_user('bob')
+        self.assertIsInstance(bob, models.User)
+        film = object_manager.build_test_app_film('memento')
+        self.assertIs(film.uploaded_by, bob)
+
+    def test_ambiguous_name(self):
+        """Ensure that unprefixed accessors of same named models fail."""
+        ObjectManager.register(OtherUser, {'carol': {'name': 'Carol'}},
+                               plural='people')
+        object_manager = ObjectManager()
+        for accessor in ('get_user', 'build_users', 'aget_user'):
+            with self.assertRaisesRegex(RuntimeError, 'other_user'):
+                getattr(object_manager, accessor)
+        with self.assertRaisesRegex(RuntimeError, 'Ambiguous'):
+            object_manager.load_fixtures({'user': ['bob']})
+        self.assertNotIn('get_people', dir(object_manager))
+        self.assertIn('get_other_people', dir(object_manager))
+        self.assertNotIn('get_user', dir(object_manager))
+
+    def test_unregistered_reference(self):
+        """Ensure that reference to unregistered model is not resolved."""
+        ObjectManager.register(OtherDoc, {'report': {'owner': 'bob'}})
+        with self.assertRaisesRegex(
+                ValueError,
+                "doc 'report': owner references unregistered model "
+                "other.User"):
+            ObjectManager.compile()
+
+    def test_converter_dispatch(self):
+        """Ensure that the closest converter of field type is used."""
+        def upper(object_manager, field, value):
+            return FieldConverterResult(value.upper(), [], True)
+
+        def domain(object_manager, field, value):
+            return FieldConverterResult(value.split('@')[1], [], True)
+
+        ObjectManager.register_converter(CharField, upper)
+        ObjectManager.register_converter(EmailField, domain)
+        bob = ObjectManager().build_user('bob')
+        self.assertEqual((bob.name, bob.email), ('BOB', 'domain.com'))
+
+
+class ScenarioObjectManager(ObjectManager):
+    """Object manager with test scenarios."""
+
+
+ScenarioObjectManager.scenario('catalog', films='__all__')
+ScenarioObjectManager.scenario('playlists', base='catalog',
+                               playlists=['favourites'])
+ScenarioObjectManager.scenario('people', users='__all__')
+
+
+class TestScenario(ObjManagerMixin, TestCase):
+    """Ensure that scenarios are built once and layered."""
+
+    object_manager_class = ScenarioObjectManager
+    object_manager_scenario = 'catalog'
+
+    def test_seeded(self):
+        """Ensure that scenario objects are returned without queries."""
+        with self.assertNumQueries(0):
+            memento = self.object_manager.get_film('memento')
+            bob = self.object_manager.get_user('bob')
+        self.assertEqual(memento.uploaded_by, bob)
+        memento.name = 'Changed'
+
+    def test_delta(self):
+        """Ensure that test objects and changes are rolled back."""
+        self.assertEqual(self.object_manager.get_film('memento').name,
+                         'Memento')
+        self.assertEqual(models.User.objects.count(), 1)
+        self.object_manager.get_user('alice')
+
+    test_delta_again = test_delta
+
+    def test_nested(self):
+        """Ensure that nested scenario creates only its own objects."""
+        with ScenarioObjectManager.scenario('playlists') as object_manager:
+            playlist = object_manager.get_playlist('favourites')
+            self.assertEqual(
+                set(playlist.films.all()),
+                {self.object_manager.get_film('memento'),
+                 self.object_manager.get_film('godfather')})
+            self.assertEqual(models.Film.objects.count(), 2)
+        self.assertFalse(models.Playlist.objects.exists())
+        self.assertEqual(models.Film.objects.count(), 2)
+
+    def test_unrelated(self):
+        """Ensure that only extending scenarios can be entered."""
+        with self.assertRaises(RuntimeError):
+            ScenarioObjectManager.scenario('people').enter()
+        with self.assertRaises(RuntimeError):
+            ScenarioObjectManager.scenario('unknown')
+        with self.assertRaises(ValueError):
+            ScenarioObjectManager.scenario('orphans', base='unknown',
+                                           users=['bob'])
+
+    def test_without_class_setup(self):
+        """Ensure that mixin does not depend on setUpClass."""
+        class Case(ObjManagerMixin, SimpleTestCase):
+            def test(self):
+                pass
+
+        case = Case('test')
+        case.setUp()
+        self.assertIsInstance(case.object_manager, ObjectManager)